@@ -7,6 +7,7 @@ from alembic import context
 
 from app.core.rag_logic import Base
 import app.core.rag_logic
+import app.core.section_store
 
 config = context.config
 
@@ -0,0 +1,49 @@
+"""add_chunk_content_hash
+
+Revision ID: 3c1f9a7d2b64
+Revises: fbdb27a2ace7
+Create Date: 2026-10-18 10:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f9a7d2b64'
+down_revision: Union[str, Sequence[str], None] = 'fbdb27a2ace7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('project_chunks', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    # Same digest as app.core.rag_logic.chunk_hash (sha256 of the UTF-8 content)
+    op.execute("""
+      UPDATE project_chunks
+      SET content_hash = encode(sha256(convert_to(coalesce(content, ''), 'UTF8')), 'hex')
+      WHERE content_hash IS NULL;
+    """)
+    # Re-uploads before this revision stored every chunk again; keep the oldest copy of each
+    op.execute("""
+      DELETE FROM project_chunks AS c
+      USING (
+        SELECT project_id, content_hash, min(id) AS keep_id
+        FROM project_chunks
+        GROUP BY project_id, content_hash
+        HAVING count(*) > 1
+      ) AS d
+      WHERE c.project_id = d.project_id
+        AND c.content_hash = d.content_hash
+        AND c.id <> d.keep_id;
+    """)
+    op.create_index('idx_project_chunks_project_hash', 'project_chunks', ['project_id', 'content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_project_chunks_project_hash', table_name='project_chunks')
+    op.drop_column('project_chunks', 'content_hash')
@@ -0,0 +1,43 @@
+"""add_projects_table
+
+Revision ID: 5b7e3d9c4f21
+Revises: 8e2d4b6f1a93
+Create Date: 2026-10-18 14:37:52.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e3d9c4f21'
+down_revision: Union[str, Sequence[str], None] = '8e2d4b6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('projects',
+      sa.Column('id', sa.String(), nullable=False),
+      sa.Column('chunk_count', sa.Integer(), server_default='0', nullable=False),
+      sa.Column('total_bytes', sa.BigInteger(), server_default='0', nullable=False),
+      sa.Column('last_ingested_at', sa.DateTime(timezone=True), nullable=True),
+      sa.Column('embedding_model', sa.String(), nullable=True),
+      sa.PrimaryKeyConstraint('id')
+    )
+    # Every existing chunk was embedded with the original model; the ingestion time is unknown
+    op.execute("""
+      INSERT INTO projects (id, chunk_count, total_bytes, last_ingested_at, embedding_model)
+      SELECT project_id, count(*), coalesce(sum(octet_length(content)), 0), NULL, 'all-mpnet-base-v2'
+      FROM project_chunks
+      WHERE project_id IS NOT NULL
+      GROUP BY project_id;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('projects')
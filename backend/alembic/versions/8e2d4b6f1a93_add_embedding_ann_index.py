@@ -0,0 +1,44 @@
+"""add_embedding_ann_index
+
+Revision ID: 8e2d4b6f1a93
+Revises: 3c1f9a7d2b64
+Create Date: 2026-10-18 11:03:17.581924
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2d4b6f1a93'
+down_revision: Union[str, Sequence[str], None] = '3c1f9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction; ingestion keeps writing while the index builds
+    with op.get_context().autocommit_block():
+        op.execute("""
+          CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_project_chunks_embedding_hnsw
+          ON project_chunks USING hnsw (embedding vector_cosine_ops)
+          WITH (m = 16, ef_construction = 64);
+        """)
+        # Optional: cheaper to build than HNSW, tuned per query with ivfflat.probes
+        if os.getenv("ANN_BUILD_IVFFLAT", "0") == "1":
+            op.execute(f"""
+              CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_project_chunks_embedding_ivfflat
+              ON project_chunks USING ivfflat (embedding vector_cosine_ops)
+              WITH (lists = {int(os.getenv("IVFFLAT_LISTS", "100"))});
+            """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_project_chunks_embedding_ivfflat;")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_project_chunks_embedding_hnsw;")
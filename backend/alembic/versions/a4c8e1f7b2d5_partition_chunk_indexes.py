@@ -0,0 +1,63 @@
+"""partition_chunk_indexes
+
+Revision ID: a4c8e1f7b2d5
+Revises: 5b7e3d9c4f21
+Create Date: 2026-10-18 16:12:08.947130
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e1f7b2d5'
+down_revision: Union[str, Sequence[str], None] = '5b7e3d9c4f21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.core.retrieval_sql.PARTITIONS verbatim, queries repeat these predicates
+PARTITIONS = {
+    "regulations": "project_id = 'SYSTEM_REGULATIONS'",
+    "template": "project_id = 'TEMPLATE_TZ'",
+    "tenants": "project_id NOT IN ('SYSTEM_REGULATIONS', 'TEMPLATE_TZ')",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Partial indexes are built next to the global ones and only then replace them,
+    # so searches keep an index while ingestion continues
+    with op.get_context().autocommit_block():
+        for name, predicate in PARTITIONS.items():
+            op.execute(f"""
+              CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_project_chunks_embedding_hnsw_{name}
+              ON project_chunks USING hnsw (embedding vector_cosine_ops)
+              WITH (m = 16, ef_construction = 64)
+              WHERE {predicate};
+            """)
+            op.execute(f"""
+              CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_project_chunks_search_vector_{name}
+              ON project_chunks USING gin (search_vector)
+              WHERE {predicate};
+            """)
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_project_chunks_embedding_hnsw;")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_project_chunks_search_vector;")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("""
+          CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_project_chunks_embedding_hnsw
+          ON project_chunks USING hnsw (embedding vector_cosine_ops)
+          WITH (m = 16, ef_construction = 64);
+        """)
+        op.execute("""
+          CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_project_chunks_search_vector
+          ON project_chunks USING gin (search_vector);
+        """)
+        for name in PARTITIONS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS idx_project_chunks_search_vector_{name};")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS idx_project_chunks_embedding_hnsw_{name};")
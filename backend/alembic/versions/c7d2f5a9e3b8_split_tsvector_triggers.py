@@ -0,0 +1,59 @@
+"""split_tsvector_triggers
+
+Revision ID: c7d2f5a9e3b8
+Revises: a4c8e1f7b2d5
+Create Date: 2026-10-18 17:45:31.602274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2f5a9e3b8'
+down_revision: Union[str, Sequence[str], None] = 'a4c8e1f7b2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+GIN_INDEXES = (
+    "idx_project_chunks_search_vector_regulations",
+    "idx_project_chunks_search_vector_template",
+    "idx_project_chunks_search_vector_tenants",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bulk ingestion computes search_vector inside its INSERT. The WHEN clause is checked by the
+    # executor, so plpgsql is never called for those rows; other inserts still get the tsvector here.
+    # Updates recompute only when content changes, so re-embedding a row does not re-run to_tsvector.
+    op.execute("DROP TRIGGER IF EXISTS trg_search_vector_update ON project_chunks;")
+    op.execute("""
+      CREATE TRIGGER trg_search_vector_insert
+      BEFORE INSERT ON project_chunks
+      FOR EACH ROW WHEN (NEW.search_vector IS NULL)
+      EXECUTE FUNCTION chunks_search_vector_update();
+    """)
+    op.execute("""
+      CREATE TRIGGER trg_search_vector_update
+      BEFORE UPDATE OF content ON project_chunks
+      FOR EACH ROW EXECUTE FUNCTION chunks_search_vector_update();
+    """)
+    # The pending list size itself is raised per transaction (gin_pending_list_limit) by bulk loads
+    for index_name in GIN_INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {index_name} SET (fastupdate = on);")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS trg_search_vector_insert ON project_chunks;")
+    op.execute("DROP TRIGGER IF EXISTS trg_search_vector_update ON project_chunks;")
+    op.execute("""
+      CREATE TRIGGER trg_search_vector_update
+      BEFORE INSERT OR UPDATE ON project_chunks
+      FOR EACH ROW EXECUTE FUNCTION chunks_search_vector_update();
+    """)
+    for index_name in GIN_INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {index_name} RESET (fastupdate);")
@@ -0,0 +1,36 @@
+"""add_generated_sections
+
+Revision ID: d9e4a6b1c5f3
+Revises: c7d2f5a9e3b8
+Create Date: 2026-10-18 19:21:44.810593
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e4a6b1c5f3'
+down_revision: Union[str, Sequence[str], None] = 'c7d2f5a9e3b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generated_sections',
+      sa.Column('project_id', sa.String(), nullable=False),
+      sa.Column('code', sa.String(), nullable=False),
+      sa.Column('fingerprint', sa.String(length=64), nullable=False),
+      sa.Column('sections', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+      sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+      sa.PrimaryKeyConstraint('project_id', 'code')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('generated_sections')
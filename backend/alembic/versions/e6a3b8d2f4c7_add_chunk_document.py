@@ -0,0 +1,41 @@
+"""add_chunk_document
+
+Revision ID: e6a3b8d2f4c7
+Revises: d9e4a6b1c5f3
+Create Date: 2026-10-18 22:14:09.337152
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a3b8d2f4c7'
+down_revision: Union[str, Sequence[str], None] = 'd9e4a6b1c5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Chunks stored before this revision have no known source file and keep the empty document
+    op.add_column('project_chunks', sa.Column('document', sa.String(), server_default='', nullable=False))
+    op.drop_index('idx_project_chunks_project_hash', table_name='project_chunks')
+    op.create_index('idx_project_chunks_project_hash', 'project_chunks', ['project_id', 'document', 'content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_project_chunks_project_hash', table_name='project_chunks')
+    # The same chunk may exist in several documents; keep one copy per project before narrowing the index
+    op.execute("""
+      DELETE FROM project_chunks AS c
+      USING project_chunks AS d
+      WHERE c.project_id = d.project_id
+        AND c.content_hash = d.content_hash
+        AND c.id > d.id;
+    """)
+    op.create_index('idx_project_chunks_project_hash', 'project_chunks', ['project_id', 'content_hash'], unique=True)
+    op.drop_column('project_chunks', 'document')
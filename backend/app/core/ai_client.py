@@ -1,15 +1,101 @@
 import os
+import json
+import time
 import httpx
-from typing import Any
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+class ConnectionMetrics:
+  # Fed by httpcore trace events: how often a request had to open a connection versus reusing
+  # a pooled one, and how long it waited before its headers could be sent
+  def __init__(self, window: int = 1024):
+    self.acquire_ms = deque(maxlen=window)
+    self.counters = {"requests": 0, "tcp_connects": 0, "tls_handshakes": 0, "reused": 0}
+
+  def tracer(self):
+    start_time = time.perf_counter()
+    state = {"connected": False, "sent": False}
+
+    async def trace(event_name: str, info: Dict[str, Any]):
+      if event_name == "connection.connect_tcp.complete":
+        state["connected"] = True
+        self.counters["tcp_connects"] += 1
+      elif event_name == "connection.start_tls.complete":
+        self.counters["tls_handshakes"] += 1
+      elif event_name.endswith("send_request_headers.started") and not state["sent"]:
+        state["sent"] = True
+        self.counters["requests"] += 1
+        if not state["connected"]:
+          self.counters["reused"] += 1
+        self.acquire_ms.append((time.perf_counter() - start_time) * 1000)
+
+    return trace
+
+  def stats(self) -> Dict[str, Any]:
+    waits = sorted(self.acquire_ms) or [0.0]
+    return {
+      **self.counters,
+      "acquire_ms": {
+        "p50": waits[len(waits) // 2],
+        "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))],
+        "max": waits[-1]
+      }
+    }
+
 class ExternalAIClient:
   def __init__(self):
     self.api_url = os.getenv("AI_API_URL")
     self.api_key = os.getenv("AI_API_KEY")
     self.model = os.getenv("AI_MODEL_NAME")
+    self.timeout = httpx.Timeout(
+      connect=float(os.getenv("AI_CONNECT_TIMEOUT", "10")),
+      read=float(os.getenv("AI_READ_TIMEOUT", "600")),
+      write=float(os.getenv("AI_WRITE_TIMEOUT", "30")),
+      pool=float(os.getenv("AI_POOL_TIMEOUT", "30"))
+    )
+    self.limits = httpx.Limits(
+      max_connections=int(os.getenv("AI_MAX_CONNECTIONS", "20")),
+      max_keepalive_connections=int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", "10")),
+      keepalive_expiry=float(os.getenv("AI_KEEPALIVE_EXPIRY", "60"))
+    )
+    self.http2 = os.getenv("AI_HTTP2", "0") == "1"
+    self.metrics = ConnectionMetrics()
+    self._client: Optional[httpx.AsyncClient] = None
+
+  async def start(self):
+    # One pooled client per process, so LLM calls reuse warm keep-alive connections
+    if self._client is None:
+      self._client = httpx.AsyncClient(
+        timeout=self.timeout,
+        limits=self.limits,
+        http2=self.http2,
+        headers={
+          "Authorization": f"Bearer {self.api_key}",
+          "Content-Type": "application/json"
+        }
+      )
+
+  @property
+  def client(self) -> httpx.AsyncClient:
+    if self._client is None:
+      raise RuntimeError("AI client is not started")
+    return self._client
+
+  async def close(self):
+    if self._client is not None:
+      await self._client.aclose()
+      self._client = None
+
+  async def _post(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> httpx.Response:
+    if self._client is None:
+      await self.start()
+    extensions = {"trace": self.metrics.tracer()}
+    if timeout is not None:
+      return await self.client.post(self.api_url, json=payload, timeout=timeout, extensions=extensions)
+    return await self.client.post(self.api_url, json=payload, extensions=extensions)
 
   async def check_connection(self):
     payload = {
@@ -19,24 +105,19 @@ class ExternalAIClient:
         "max_tokens": 1 
       }
     }
-    headers = {
-      "Authorization": f"Bearer {self.api_key}",
-      "Content-Type": "application/json"
-    }
 
-    async with httpx.AsyncClient(timeout=5.0) as client:
-      try:
-        response = await client.post(self.api_url, json=payload, headers=headers)
-        if response.status_code == 200:
-          return {"status": "healthy", "message": "Зв'язок з AI встановлено"}
-        return {
-          "status": "unhealthy", 
-          "error": f"API повернув помилку {response.status_code}: {response.text}"
-        }
-      except Exception as e:
-        return {"status": "error", "error": str(e)}
+    try:
+      response = await self._post(payload, timeout=5.0)
+      if response.status_code == 200:
+        return {"status": "healthy", "message": "Зв'язок з AI встановлено"}
+      return {
+        "status": "unhealthy", 
+        "error": f"API повернув помилку {response.status_code}: {response.text}"
+      }
+    except Exception as e:
+      return {"status": "error", "error": str(e)}
 
-  async def generate_structured_response(self, request_data: Any, rag_context_str: str = None):
+  def _payload(self, request_data: Any, rag_context_str: str = None) -> Dict[str, Any]:
     messages_payload = [
       m.dict() if hasattr(m, "dict") else m 
       for m in request_data.messages
@@ -57,17 +138,99 @@ class ExternalAIClient:
       }
     }
 
-    headers = {
-      "Authorization": f"Bearer {self.api_key}",
-      "Content-Type": "application/json"
-    }
+    return payload
+
+  async def generate_structured_response(self, request_data: Any, rag_context_str: str = None):
+    payload = self._payload(request_data, rag_context_str)
+    try:
+      response = await self._post(payload)
+      response.raise_for_status()
+      return response.json()
+    except Exception as e:
+      return {"status": "error", "message": f"AI Client Error: {str(e)}"}
+
+  async def stream_structured_response(self, request_data: Any, rag_context_str: str = None) -> AsyncIterator[Dict[str, Any]]:
+    # Yields {"type": "token", "text"} for every upstream delta and finally {"type": "response", "response"}
+    # shaped like generate_structured_response's result. The upstream may answer with SSE or NDJSON
+    # deltas, or ignore the stream flag and return one JSON body.
+    payload = self._payload(request_data, rag_context_str)
+    payload["inputs"]["stream"] = True
+    if self._client is None:
+      await self.start()
+
+    text_parts = []
+    final_response = None
+    try:
+      async with self.client.stream("POST", self.api_url, json=payload, extensions={"trace": self.metrics.tracer()}) as response:
+        if response.status_code >= 400:
+          body = await response.aread()
+          yield {"type": "response", "response": {"status": "error", "message": f"AI Client Error: {response.status_code} {body.decode(errors='replace')}"}}
+          return
+        content_type = response.headers.get("content-type", "")
+        if "event-stream" not in content_type and "ndjson" not in content_type:
+          yield {"type": "response", "response": json.loads(await response.aread())}
+          return
+
+        async for line in response.aiter_lines():
+          line = line.strip()
+          if not line or line.startswith((":", "event:", "id:", "retry:")):
+            continue
+          if line.startswith("data:"):
+            line = line[5:].strip()
+          if line == "[DONE]":
+            break
+          try:
+            event = json.loads(line)
+          except json.JSONDecodeError:
+            continue
+          token = token_text(event)
+          if token:
+            text_parts.append(token)
+            yield {"type": "token", "text": token}
+          if isinstance(event, dict) and ("output" in event or event.get("status") == "error"):
+            final_response = event
+    except Exception as e:
+      yield {"type": "response", "response": {"status": "error", "message": f"AI Client Error: {str(e)}"}}
+      return
+
+    if final_response is None:
+      final_response = response_from_text(request_data.mode, "".join(text_parts))
+    yield {"type": "response", "response": final_response}
+
+def token_text(event: Any) -> str:
+  # Token deltas as sent by common streaming servers: {"token": ...}, {"token": {"text": ...}},
+  # {"delta": ...}, {"text": ...} or OpenAI-style {"choices": [{"delta": {"content": ...}}]}
+  if not isinstance(event, dict):
+    return ""
+  token = event.get("token")
+  if isinstance(token, dict):
+    return token.get("text") or ""
+  if isinstance(token, str):
+    return token
+  for key in ("delta", "text"):
+    if isinstance(event.get(key), str):
+      return event[key]
+  choices = event.get("choices")
+  if isinstance(choices, list) and choices:
+    delta = choices[0].get("delta") or {}
+    return delta.get("content") or ""
+  return ""
+
+def extract_json(text: str) -> str:
+  text = text.strip()
+  if "```json" in text:
+    return text.split("```json")[1].split("```")[0].strip()
+  if "{" in text:
+    return text[text.find("{"):text.rfind("}") + 1]
+  return text
 
-    async with httpx.AsyncClient(timeout=600.0) as client:
-      try:
-        response = await client.post(self.api_url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
-      except Exception as e:
-        return {"status": "error", "message": f"AI Client Error: {str(e)}"}
+def response_from_text(mode: str, text: str) -> Dict[str, Any]:
+  # Builds the handler's non-streaming response shape from the concatenated tokens
+  try:
+    return {"output": json.loads(extract_json(text))}
+  except json.JSONDecodeError:
+    if mode == "generate_tz":
+      return {"output": {}, "raw_output": text}
+    return {"output": {"answer": {"text": text, "citations": []}}}
 
 ai_client = ExternalAIClient()
\ No newline at end of file
@@ -0,0 +1,91 @@
+import re
+import copy
+import numpy as np
+from typing import List, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+class VectorizedSemanticChunker:
+  # Same breakpoint semantics as langchain_experimental's SemanticChunker with
+  # breakpoint_threshold_type="standard_deviation", but every sentence of every document is
+  # embedded in batched calls and breakpoints are found with one vectorized pass per document.
+  # The sentence vectors are kept so chunk vectors can be pooled instead of re-embedded.
+  def __init__(
+    self,
+    embeddings: Embeddings,
+    breakpoint_threshold_amount: float = 3.0,
+    buffer_size: int = 1,
+    sentence_split_regex: str = r"(?<=[.?!])\s+",
+    batch_size: int = 64
+  ):
+    self.embeddings = embeddings
+    self.breakpoint_threshold_amount = breakpoint_threshold_amount
+    self.buffer_size = buffer_size
+    self.sentence_split_regex = sentence_split_regex
+    self.batch_size = batch_size
+
+  def _combine_sentences(self, sentences: List[str]) -> List[str]:
+    combined = []
+    for i in range(len(sentences)):
+      window = sentences[max(0, i - self.buffer_size):i + self.buffer_size + 1]
+      combined.append(" ".join(window))
+    return combined
+
+  def _embed(self, texts: List[str]) -> np.ndarray:
+    vectors = []
+    for start in range(0, len(texts), self.batch_size):
+      vectors.extend(self.embeddings.embed_documents(texts[start:start + self.batch_size]))
+    return np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+
+  def _breakpoints(self, vectors: np.ndarray) -> np.ndarray:
+    if len(vectors) < 2:
+      return np.empty(0, dtype=np.int64)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms == 0, 1.0, norms)
+    distances = 1.0 - np.einsum("ij,ij->i", unit[:-1], unit[1:])
+    threshold = distances.mean() + self.breakpoint_threshold_amount * distances.std()
+    return np.flatnonzero(distances > threshold)
+
+  def _split_with_vectors(self, texts: List[str]) -> List[List[Tuple[str, np.ndarray]]]:
+    sentences_per_text = [re.split(self.sentence_split_regex, t) for t in texts]
+    combined = [self._combine_sentences(sentences) for sentences in sentences_per_text]
+
+    # One batched embedding pass over the sentences of all texts
+    flat = [sentence for group in combined for sentence in group]
+    all_vectors = self._embed(flat) if flat else np.empty((0, 0), dtype=np.float32)
+
+    results = []
+    offset = 0
+    for sentences in sentences_per_text:
+      vectors = all_vectors[offset:offset + len(sentences)]
+      offset += len(sentences)
+
+      bounds = np.append(self._breakpoints(vectors) + 1, len(sentences))
+      chunks = []
+      start = 0
+      for end in bounds:
+        if end <= start:
+          continue
+        pooled = vectors[start:end].mean(axis=0)
+        norm = np.linalg.norm(pooled)
+        chunks.append((" ".join(sentences[start:end]), pooled / norm if norm else pooled))
+        start = end
+      results.append(chunks)
+    return results
+
+  def split_text(self, text: str) -> List[str]:
+    return [chunk for chunk, _ in self._split_with_vectors([text])[0]]
+
+  def split_documents_with_vectors(self, documents: List[Document]) -> Tuple[List[Document], List[List[float]]]:
+    chunk_docs = []
+    chunk_vectors = []
+    splits = self._split_with_vectors([doc.page_content for doc in documents])
+    for doc, chunks in zip(documents, splits):
+      for content, vector in chunks:
+        chunk_docs.append(Document(page_content=content, metadata=copy.deepcopy(doc.metadata)))
+        chunk_vectors.append(vector.tolist())
+    return chunk_docs, chunk_vectors
+
+  def split_documents(self, documents: List[Document]) -> List[Document]:
+    return self.split_documents_with_vectors(documents)[0]
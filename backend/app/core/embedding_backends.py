@@ -0,0 +1,72 @@
+import os
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from app.core.logger import logger
+
+class SentenceTransformerBackend(Embeddings):
+  # PyTorch execution of the sentence-transformers model (the original behaviour)
+  name = "torch"
+
+  def __init__(self, model_name: str, batch_size: int = 32):
+    self.model_name = model_name
+    self.batch_size = batch_size
+    self.model = self._load()
+
+  def _load(self):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(self.model_name)
+
+  def embed_documents(self, texts: List[str]) -> List[List[float]]:
+    return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True).tolist()
+
+  def embed_query(self, text: str) -> List[float]:
+    return self.embed_documents([text])[0]
+
+class OnnxBackend(SentenceTransformerBackend):
+  # ONNX Runtime export of the same model, fp32
+  name = "onnx"
+
+  def _load(self):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(self.model_name, backend="onnx")
+
+class QuantizedOnnxBackend(SentenceTransformerBackend):
+  # Dynamically quantized int8 ONNX model. The published export for the target CPU
+  # architecture is used when the hub repo has one, otherwise it is exported locally once.
+  name = "onnx-int8"
+
+  def __init__(self, model_name: str, batch_size: int = 32):
+    self.quantization = os.getenv("EMBEDDING_ONNX_QUANTIZATION", "avx512_vnni")
+    self.export_dir = os.getenv("EMBEDDING_ONNX_DIR", os.path.join(".cache", "onnx", model_name.replace("/", "__")))
+    super().__init__(model_name, batch_size)
+
+  def _load(self):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    file_name = f"onnx/model_qint8_{self.quantization}.onnx"
+    try:
+      return SentenceTransformer(self.model_name, backend="onnx", model_kwargs={"file_name": file_name})
+    except Exception as e:
+      logger.info(f"No published {file_name} for '{self.model_name}' ({e}), exporting locally.")
+
+    if not os.path.exists(os.path.join(self.export_dir, file_name)):
+      model = SentenceTransformer(self.model_name, backend="onnx")
+      model.save(self.export_dir)
+      export_dynamic_quantized_onnx_model(model, self.quantization, self.export_dir)
+    return SentenceTransformer(self.export_dir, backend="onnx", model_kwargs={"file_name": file_name})
+
+EMBEDDING_BACKENDS = {
+  backend.name: backend
+  for backend in (SentenceTransformerBackend, OnnxBackend, QuantizedOnnxBackend)
+}
+
+def build_embedding_backend(model_name: str, backend: str = "torch") -> Embeddings:
+  if backend not in EMBEDDING_BACKENDS:
+    raise ValueError(f"Unknown embedding backend '{backend}', expected one of {sorted(EMBEDDING_BACKENDS)}")
+  return EMBEDDING_BACKENDS[backend](model_name)
+
+def backend_cache_key(model_name: str, backend: str) -> str:
+  # Quantized and fp32 vectors differ slightly, so each backend gets its own cache namespace
+  return model_name if backend == "torch" else f"{model_name}@{backend}"
@@ -0,0 +1,99 @@
+import os
+import time
+import asyncio
+from typing import List, Dict, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from app.core.logger import logger
+
+class EmbeddingBatcher:
+  # Collects concurrent embed_query calls for up to max_wait_ms (or max_batch_size texts),
+  # runs one batched forward pass off the event loop and resolves every caller's future.
+  def __init__(self, embeddings: Embeddings, max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+    self.embeddings = embeddings
+    self.max_batch_size = max_batch_size or int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+    self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))) / 1000
+    self._queue: Optional[asyncio.Queue] = None
+    self._worker: Optional[asyncio.Task] = None
+    self._loop: Optional[asyncio.AbstractEventLoop] = None
+    self.counters = {"requests": 0, "batches": 0, "largest_batch": 0, "wait_ms_total": 0.0, "forward_ms_total": 0.0}
+
+  def _ensure_worker(self):
+    loop = asyncio.get_running_loop()
+    if self._worker is None or self._worker.done() or self._loop is not loop:
+      # Queues and tasks are loop-bound; research scripts may run several asyncio.run() in a row
+      self._loop = loop
+      self._queue = asyncio.Queue()
+      self._worker = loop.create_task(self._run())
+
+  async def embed_query(self, text: str) -> List[float]:
+    self._ensure_worker()
+    future = asyncio.get_running_loop().create_future()
+    self._queue.put_nowait((text, future, time.perf_counter()))
+    return await future
+
+  async def _collect(self) -> list:
+    batch = [await self._queue.get()]
+    deadline = time.perf_counter() + self.max_wait
+    while len(batch) < self.max_batch_size:
+      timeout = deadline - time.perf_counter()
+      if timeout <= 0:
+        break
+      try:
+        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+      except asyncio.TimeoutError:
+        break
+    return batch
+
+  async def _run(self):
+    while True:
+      batch = await self._collect()
+      started = time.perf_counter()
+      texts = [text for text, _, _ in batch]
+      try:
+        vectors = await asyncio.to_thread(self.embeddings.embed_documents, texts)
+      except Exception as e:
+        logger.error(f"Batched embedding failed for {len(texts)} queries: {e}")
+        for _, future, _ in batch:
+          if not future.done():
+            future.set_exception(e)
+        continue
+
+      for (_, future, _), vector in zip(batch, vectors):
+        if not future.done():
+          future.set_result(vector)
+
+      self.counters["requests"] += len(batch)
+      self.counters["batches"] += 1
+      self.counters["largest_batch"] = max(self.counters["largest_batch"], len(batch))
+      self.counters["wait_ms_total"] += sum(started - enqueued for _, _, enqueued in batch) * 1000
+      self.counters["forward_ms_total"] += (time.perf_counter() - started) * 1000
+
+  async def close(self):
+    if self._worker and not self._worker.done():
+      self._worker.cancel()
+      try:
+        await self._worker
+      except asyncio.CancelledError:
+        pass
+    if self._queue:
+      while not self._queue.empty():
+        _, future, _ = self._queue.get_nowait()
+        if not future.done():
+          future.cancel()
+    self._worker = None
+
+  def stats(self) -> Dict[str, float]:
+    requests = self.counters["requests"]
+    batches = self.counters["batches"]
+    return {
+      "max_batch_size": self.max_batch_size,
+      "max_wait_ms": self.max_wait * 1000,
+      "requests": requests,
+      "batches": batches,
+      "largest_batch": self.counters["largest_batch"],
+      "avg_batch_size": round(requests / batches, 2) if batches else 0.0,
+      "avg_wait_ms": round(self.counters["wait_ms_total"] / requests, 3) if requests else 0.0,
+      "avg_forward_ms": round(self.counters["forward_ms_total"] / batches, 3) if batches else 0.0,
+    }
@@ -0,0 +1,153 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Optional, Callable
+
+from langchain_core.embeddings import Embeddings
+
+from app.core.logger import logger
+
+def text_digest(text: str) -> str:
+  return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class CachedEmbeddings(Embeddings):
+  # Two-tier cache in front of any langchain Embeddings:
+  # an in-process LRU bounded by item count and an SQLite file shared across restarts and
+  # worker processes. Entries are keyed by (model_key, sha256 of the text).
+  def __init__(
+    self,
+    base: Optional[Embeddings] = None,
+    model_key: str = "",
+    max_memory_items: Optional[int] = None,
+    disk_path: Optional[str] = None,
+    base_factory: Optional[Callable[[], Embeddings]] = None
+  ):
+    # base_factory defers loading the model until the first cache miss
+    self._base = base
+    self._base_factory = base_factory
+    self._base_lock = threading.Lock()
+    self.model_key = model_key
+    self.max_memory_items = max_memory_items if max_memory_items is not None else int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "20000"))
+    self.disk_path = disk_path if disk_path is not None else os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+    self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+    self._lock = threading.Lock()
+    self._db: Optional[sqlite3.Connection] = None
+    self._db_failed = False
+    self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+  @property
+  def base(self) -> Embeddings:
+    if self._base is None:
+      with self._base_lock:
+        if self._base is None:
+          self._base = self._base_factory()
+    return self._base
+
+  @property
+  def base_loaded(self) -> bool:
+    return self._base is not None
+
+  def _connection(self) -> Optional[sqlite3.Connection]:
+    # Opened lazily so every process (API, ingestion workers, research scripts) gets its own handle
+    if self._db is None and self.disk_path and not self._db_failed:
+      try:
+        directory = os.path.dirname(self.disk_path)
+        if directory:
+          os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.disk_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+          "CREATE TABLE IF NOT EXISTS embeddings ("
+          "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+          "PRIMARY KEY (model, text_hash))"
+        )
+        self._db.commit()
+      except sqlite3.Error as e:
+        logger.warning(f"Embedding disk cache disabled: {e}")
+        self._db = None
+        self._db_failed = True
+    return self._db
+
+  def _remember(self, digest: str, vector: np.ndarray):
+    self._memory[digest] = vector
+    self._memory.move_to_end(digest)
+    while len(self._memory) > self.max_memory_items:
+      self._memory.popitem(last=False)
+
+  def _lookup(self, digests: List[str]) -> Dict[str, np.ndarray]:
+    found = {}
+    with self._lock:
+      for digest in digests:
+        vector = self._memory.get(digest)
+        if vector is not None:
+          self._memory.move_to_end(digest)
+          found[digest] = vector
+      self.counters["memory_hits"] += len(found)
+
+      remaining = [d for d in digests if d not in found]
+      db = self._connection() if remaining else None
+      if db is not None:
+        for start in range(0, len(remaining), 500):
+          batch = remaining[start:start + 500]
+          placeholders = ",".join("?" * len(batch))
+          rows = db.execute(
+            f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+            [self.model_key, *batch]
+          ).fetchall()
+          for digest, blob in rows:
+            vector = np.frombuffer(blob, dtype=np.float32)
+            found[digest] = vector
+            self._remember(digest, vector)
+          self.counters["disk_hits"] += len(rows)
+    return found
+
+  def _store(self, vectors: Dict[str, np.ndarray]):
+    with self._lock:
+      for digest, vector in vectors.items():
+        self._remember(digest, vector)
+      db = self._connection()
+      if db is not None:
+        db.executemany(
+          "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+          [(self.model_key, digest, vector.tobytes()) for digest, vector in vectors.items()]
+        )
+        db.commit()
+
+  def _embed(self, texts: List[str], query: bool) -> List[List[float]]:
+    digests = [text_digest(t) for t in texts]
+    found = self._lookup(list(dict.fromkeys(digests)))
+
+    # Each distinct missing text is embedded once, in a single batched call
+    missing = {}
+    for digest, t in zip(digests, texts):
+      if digest not in found and digest not in missing:
+        missing[digest] = t
+    if missing:
+      with self._lock:
+        self.counters["misses"] += len(missing)
+      if query and len(missing) == 1:
+        computed = [self.base.embed_query(next(iter(missing.values())))]
+      else:
+        computed = self.base.embed_documents(list(missing.values()))
+      fresh = {digest: np.asarray(v, dtype=np.float32) for digest, v in zip(missing, computed)}
+      self._store(fresh)
+      found.update(fresh)
+
+    return [found[digest].tolist() for digest in digests]
+
+  def embed_documents(self, texts: List[str]) -> List[List[float]]:
+    return self._embed(texts, query=False)
+
+  def embed_query(self, text: str) -> List[float]:
+    return self._embed([text], query=True)[0]
+
+  def stats(self) -> Dict[str, float]:
+    with self._lock:
+      counters = dict(self.counters)
+      counters["memory_items"] = len(self._memory)
+    lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+    counters["hit_rate"] = round((counters["memory_hits"] + counters["disk_hits"]) / lookups, 4) if lookups else 0.0
+    return counters
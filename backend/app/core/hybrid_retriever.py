@@ -1,4 +1,5 @@
 import numpy as np
+from sqlalchemy import select, func, case, literal, Float
 
 class HybridRetriever:
   def __init__(self, k_constant=10, vector_weight=0.8):
@@ -27,4 +28,21 @@ class HybridRetriever:
     
     # Sorting after RRF score
     sorted_res = sorted(scores.values(), key=lambda x: x['score'], reverse=True)
-    return [item['doc'] for item in sorted_res]
\ No newline at end of file
+    return [item['doc'] for item in sorted_res]
+
+  # Same fusion as rrf_merge, expressed over two ranked CTEs (id, rank[, distance]) so the
+  # database can fuse the candidate lists and return only the top rows
+  def rrf_select(self, vec, kw, keyword_score: float = 0.7):
+    rrf = (
+      func.coalesce(self.vector_weight / (self.k + vec.c.rank), 0.0)
+      + func.coalesce(literal(1.0, Float) / (self.k + kw.c.rank), 0.0)
+    ).label("rrf")
+    # rrf_merge keeps the last score set on a doc: keyword hits report keyword_score
+    score = case((kw.c.id.isnot(None), keyword_score), else_=1 - vec.c.distance).label("score")
+    return select(
+      func.coalesce(vec.c.id, kw.c.id).label("id"),
+      rrf,
+      score,
+      vec.c.rank.label("vec_rank"),
+      kw.c.rank.label("kw_rank")
+    ).select_from(vec.join(kw, vec.c.id == kw.c.id, full=True))
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Union
+
+from app.core.rag_logic import rag_engine
+from app.core.uploads import discard_upload
+from app.core.logger import logger
+
+TERMINAL_STAGES = ("done", "failed")
+
+def _prepare_in_worker(job_id: str, project_id: str, document: str, source: Union[str, bytes], known_hashes: set, progress_store):
+  # Runs inside a pool process: the engine (and the model) is built once per worker on first import
+  from app.core.rag_logic import rag_engine as worker_engine
+
+  def report(stage: str, fraction: float, timings: Dict[str, float]):
+    progress_store[job_id] = {"stage": stage, "progress": round(fraction, 4), "timings": dict(timings)}
+
+  return worker_engine.prepare_chunks(project_id, document, source, known_hashes=known_hashes, progress=report)
+
+class IngestJobManager:
+  def __init__(self):
+    self.max_workers = int(os.getenv("INGEST_MAX_WORKERS", "1"))
+    self.max_pending = int(os.getenv("INGEST_MAX_PENDING", "16"))
+    self.history_size = int(os.getenv("INGEST_JOB_HISTORY", "100"))
+    self.jobs: Dict[str, Dict[str, Any]] = {}
+    self._tasks = set()
+    self._executor: Optional[ProcessPoolExecutor] = None
+    self._manager = None
+    self._progress = None
+
+  def start(self):
+    if self._executor:
+      return
+    # spawn keeps torch thread pools of the parent out of the workers
+    ctx = multiprocessing.get_context("spawn")
+    self._manager = ctx.Manager()
+    self._progress = self._manager.dict()
+    self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+    logger.info(f"Ingestion pool started with {self.max_workers} worker(s)")
+
+  def pending_count(self) -> int:
+    return sum(1 for job in self.jobs.values() if job["stage"] not in TERMINAL_STAGES)
+
+  def submit(self, project_id: str, document: str, source: Union[str, bytes]) -> str:
+    if not self._executor:
+      raise RuntimeError("Ingestion pool is not running")
+    if self.pending_count() >= self.max_pending:
+      raise OverflowError(f"Too many ingestion jobs in flight (limit {self.max_pending})")
+
+    job_id = uuid.uuid4().hex
+    self.jobs[job_id] = {
+      "job_id": job_id,
+      "project_id": project_id,
+      "document": document,
+      "stage": "queued",
+      "progress": 0.0,
+      "timings": {},
+      "chunks_indexed": None,
+      "changes": None,
+      "error": None,
+      "created_at": time.time(),
+    }
+    task = asyncio.create_task(self._run(job_id, project_id, document, source))
+    self._tasks.add(task)
+    task.add_done_callback(self._tasks.discard)
+    self._prune_history()
+    return job_id
+
+  async def _run(self, job_id: str, project_id: str, document: str, source: Union[str, bytes]):
+    job = self.jobs[job_id]
+    loop = asyncio.get_running_loop()
+    overall_start = time.perf_counter()
+    try:
+      known_hashes = await rag_engine.get_chunk_hashes(project_id, document)
+      rows, timings = await loop.run_in_executor(
+        self._executor, _prepare_in_worker, job_id, project_id, document, source, known_hashes, self._progress
+      )
+      job.update({"stage": "storing", "progress": 1.0, "timings": timings})
+
+      start_time = time.perf_counter()
+      stats = await rag_engine.store_chunks(project_id, document, rows)
+      job.update({"chunks_indexed": stats["total"], "changes": stats})
+      timings["store"] = time.perf_counter() - start_time
+      timings["total"] = time.perf_counter() - overall_start
+      job.update({"stage": "done", "timings": timings})
+      logger.info(f"[INGEST JOB {job_id}] Project '{project_id}' indexed {job['chunks_indexed']} chunks of '{document}' in {timings['total']:.4f} seconds.")
+    except Exception as e:
+      logger.error(f"[INGEST JOB {job_id}] Failed for project '{project_id}': {e}")
+      job.update({"stage": "failed", "error": str(e)})
+    finally:
+      self._progress.pop(job_id, None)
+      discard_upload(source)
+
+  def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+    job = self.jobs.get(job_id)
+    if job is None:
+      return None
+    snapshot = dict(job)
+    if job["stage"] == "queued":
+      # Live progress is published by the worker process while it loads, chunks and embeds
+      live = self._progress.get(job_id)
+      if live:
+        snapshot.update(live)
+    return snapshot
+
+  def _prune_history(self):
+    finished = [job_id for job_id, job in self.jobs.items() if job["stage"] in TERMINAL_STAGES]
+    for job_id in finished[:max(0, len(finished) - self.history_size)]:
+      del self.jobs[job_id]
+
+  async def shutdown(self):
+    if self._tasks:
+      logger.info(f"Draining {len(self._tasks)} ingestion job(s)...")
+      await asyncio.gather(*self._tasks, return_exceptions=True)
+    if self._executor:
+      self._executor.shutdown(wait=True)
+      self._executor = None
+    if self._manager:
+      self._manager.shutdown()
+      self._manager = None
+    logger.info("Ingestion pool stopped")
+
+ingest_jobs = IngestJobManager()
@@ -1,23 +1,32 @@
 import time
 import os
+import asyncio
+import io
+import hashlib
 import logging
 import numpy as np
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable, Union
 import re
 
-from sqlalchemy import Column, Integer, Text, String, select, text, func, Index
+from sqlalchemy import Column, Integer, BigInteger, DateTime, Text, String, select, insert, update, delete, text, func, bindparam, Index
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.dialects.postgresql import TSVECTOR, insert as pg_insert
 from pgvector.sqlalchemy import Vector
-from sqlalchemy import or_
+from sqlalchemy import and_, union_all
 
-from langchain_experimental.text_splitter import SemanticChunker
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import Docx2txtLoader
+from langchain_core.documents import Document
 
 from app.core.hybrid_retriever import HybridRetriever
+from app.core.chunker import VectorizedSemanticChunker
+from app.core.embedding_cache import CachedEmbeddings
+from app.core.embedding_backends import build_embedding_backend, backend_cache_key
+from app.core.embedding_batcher import EmbeddingBatcher
+from app.core.vector_index import ProjectVectorIndex
+from app.core.retrieval_cache import RetrievalCache, normalize_query
+from app.core.db_pool import pool_options, instrument_engine, prewarm, PRIMING_QUERY
+from app.core import retrieval_sql
 from app.core.logger import logger
 
 Base = declarative_base()
@@ -26,82 +35,469 @@ class ProjectChunk(Base):
   __tablename__ = 'project_chunks'
   id = Column(Integer, primary_key=True)
   project_id = Column(String, index=True)
+  # File the chunk came from; re-uploading a document only replaces that document's chunks
+  document = Column(String, nullable=False, default='', server_default='')
   content = Column(Text)
+  content_hash = Column(String(64))
   embedding = Column(Vector(768))
   search_vector = Column(TSVECTOR)
   logging.basicConfig(level=logging.INFO)
 
+  # Shared corpora and tenant projects get separate partial ANN and full-text indexes
   __table_args__ = (
-    Index('idx_project_chunks_search_vector', 'search_vector', postgresql_using='gin'),
+    Index('idx_project_chunks_project_hash', 'project_id', 'document', 'content_hash', unique=True),
+    *[
+      Index(
+        f'idx_project_chunks_embedding_hnsw_{name}', 'embedding',
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+        postgresql_where=text(predicate)
+      )
+      for name, predicate in retrieval_sql.PARTITIONS.items()
+    ],
+    *[
+      Index(
+        f'idx_project_chunks_search_vector_{name}', 'search_vector',
+        postgresql_using='gin',
+        postgresql_where=text(predicate)
+      )
+      for name, predicate in retrieval_sql.PARTITIONS.items()
+    ],
   )
 
+class Project(Base):
+  # One row per project, maintained in the same transaction as its chunks
+  __tablename__ = 'projects'
+  id = Column(String, primary_key=True)
+  chunk_count = Column(Integer, nullable=False, default=0, server_default='0')
+  total_bytes = Column(BigInteger, nullable=False, default=0, server_default='0')
+  last_ingested_at = Column(DateTime(timezone=True))
+  embedding_model = Column(String)
+
+def chunk_hash(content: str) -> str:
+  return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def contextual_text(project_id: str, content: str) -> str:
+  return f"Проект: {project_id}. Зміст: {content}"
+
+@dataclass
+class RetrievedChunk:
+  # Projection of a project_chunks row used by retrieval: no embedding, no ORM identity map
+  id: int
+  project_id: str
+  content: str
+  score: float = 0.0
+
+  def to_dict(self) -> Dict[str, Any]:
+    return {"id": str(self.id), "content": self.content, "source": self.project_id, "score": self.score}
+
 class RAGEngine:
   def __init__(self):
     self.url = os.getenv("DATABASE_URL")
-    self.engine = create_async_engine(self.url)
+    self.engine = create_async_engine(self.url, **pool_options())
+    instrument_engine(self.engine)
+    self.pool_min_warm = int(os.getenv("DB_POOL_MIN_WARM", "5"))
     self.async_session = sessionmaker(self.engine, class_=AsyncSession)
-    self.embeddings = HuggingFaceEmbeddings(model_name="all-mpnet-base-v2")
-    self.retriever = HybridRetriever()
-    self.base_splitter = RecursiveCharacterTextSplitter(
-      chunk_size=1000,
-      chunk_overlap=200,
-      separators=["\n\n", "\n", "Таблиця", "FR-", ". "]
+    self.model_name = "all-mpnet-base-v2"
+    self.embedding_backend = os.getenv("EMBEDDING_BACKEND", "torch")
+    # torch and sentence-transformers are only imported on the first embedding cache miss
+    self.embeddings = CachedEmbeddings(
+      model_key=backend_cache_key(self.model_name, self.embedding_backend),
+      base_factory=self._load_model
     )
+    self.query_embedder = EmbeddingBatcher(self.embeddings)
+    self.retriever = HybridRetriever()
+    self.embed_batch_size = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+    self._base_splitter = None
 
-    self.text_splitter = SemanticChunker(
+    self.text_splitter = VectorizedSemanticChunker(
       self.embeddings,
-      breakpoint_threshold_type="standard_deviation",
       breakpoint_threshold_amount=0.8,
-      buffer_size=1
+      buffer_size=1,
+      batch_size=self.embed_batch_size
     )
+    # "reembed": chunk vectors from a second pass with the project prefix (original behaviour)
+    # "pooled": chunk vectors are the mean of the sentence vectors the chunker already computed
+    self.chunk_vector_mode = os.getenv("CHUNK_VECTOR_MODE", "reembed")
+    # "trigger": per-row plpgsql trigger; "inline": to_tsvector computed inside the INSERT; "auto": inline for bulk inserts
+    self.tsvector_mode = os.getenv("TSVECTOR_MODE", "trigger")
+    # Inserts of at least this many rows are bulk loads: larger GIN pending list, flushed afterwards
+    self.bulk_insert_min_rows = int(os.getenv("BULK_INSERT_MIN_ROWS", "200"))
+    self.gin_pending_list_kb = int(os.getenv("GIN_PENDING_LIST_LIMIT_KB", "65536"))
+    # Bumped whenever a project's chunks change; caches derived from a corpus compare against it
+    self.project_versions: Dict[str, int] = {}
+    # Bumped together with any project version; guards results that are not bounded to projects
+    self.corpus_version = 0
+    self.model_ready = False
+    self.db_ready = False
+    # A failed boot warmup is retried in the background when readiness is polled, at most this often
+    self.warmup_retry_seconds = float(os.getenv("WARMUP_RETRY_SECONDS", "10"))
+    # Boot warmup or a retry; the engine is not ready while it runs
+    self._warmup_task = None
+    self._rewarm_at = 0.0
+    # ANN recall/latency defaults; get_context can override them per call
+    self.ef_search = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    self.probes = int(os.getenv("IVFFLAT_PROBES", "10"))
+    # pgvector >= 0.8 keeps scanning the index until enough rows pass the project_id filter
+    self.iterative_scan = os.getenv("ANN_ITERATIVE_SCAN", "strict_order")
+    self.hybrid_fusion = os.getenv("HYBRID_FUSION", "sql")
+    # "orm": SQLAlchemy Core projections; "asyncpg": raw prepared statements with a binary vector codec
+    self.retrieval_driver = os.getenv("RETRIEVAL_DRIVER", "orm")
+    self._fast_pool = None
+    # Concurrent first searches would otherwise each create (and leak) their own pool
+    self._fast_pool_lock = asyncio.Lock()
+    self.many_concurrency = int(os.getenv("RETRIEVAL_MANY_CONCURRENCY", "5"))
+    self.vector_index = ProjectVectorIndex(self._load_project_vectors, self.project_version)
+    self.result_cache = RetrievalCache()
+
+  @property
+  def vector_space(self) -> str:
+    # What stored chunk vectors must match to be reused: the backend's model key, plus the chunk vector mode
+    model_key = self.embeddings.model_key
+    return model_key if self.chunk_vector_mode == "reembed" else f"{model_key}#{self.chunk_vector_mode}"
+
+  def _load_model(self):
+    start_time = time.perf_counter()
+    model = build_embedding_backend(self.model_name, self.embedding_backend)
+    logger.info(f"Embedding model '{self.model_name}' ({self.embedding_backend}) loaded in {time.perf_counter() - start_time:.4f} seconds.")
+    return model
+
+  @property
+  def base_splitter(self):
+    if self._base_splitter is None:
+      from langchain_text_splitters import RecursiveCharacterTextSplitter
+      self._base_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        separators=["\n\n", "\n", "Таблиця", "FR-", ". "]
+      )
+    return self._base_splitter
+
+  async def warmup(self, batch_size: int = 8):
+    # Loads the model and runs a dummy batch straight through it (bypassing the cache),
+    # then checks the database, so the first real request does not pay for either
+    await self.warm_model(batch_size)
+    await self.warm_db()
+
+  async def warm_model(self, batch_size: int = 8):
+    if self.model_ready:
+      return
+    start_time = time.perf_counter()
+    await asyncio.to_thread(self.embeddings.base.embed_documents, ["Прогрів моделі."] * batch_size)
+    self.model_ready = True
+    logger.info(f"Model warmup finished in {time.perf_counter() - start_time:.4f} seconds.")
+
+  async def warm_db(self):
+    if self.db_ready:
+      return
+    start_time = time.perf_counter()
+    async with self.engine.connect() as conn:
+      await conn.execute(text("SELECT 1"))
+    await prewarm(self.engine, min(self.pool_min_warm, self.engine.pool.size()))
+    self.db_ready = True
+    logger.info(f"DB warmup finished in {time.perf_counter() - start_time:.4f} seconds.")
+
+  def start_warmup(self, then: Optional[Callable[[], Any]] = None) -> asyncio.Task:
+    # Runs the boot warmup (and `then`, e.g. warming dependent caches) in the background,
+    # so the server accepts connections and answers readiness probes while the model loads
+    async def boot():
+      try:
+        await self.warmup()
+        if then is not None:
+          await then()
+      except Exception as e:
+        logger.error(f"Warmup error: {e}")
+
+    self._rewarm_at = time.monotonic()
+    self._warmup_task = asyncio.create_task(boot())
+    return self._warmup_task
+
+  async def _rewarm(self):
+    # Each part is retried on its own, so a database outage does not keep the model from loading
+    for step in (self.warm_model, self.warm_db):
+      try:
+        await step()
+      except Exception as e:
+        logger.warning(f"Warmup retry ({step.__name__}) failed: {e}")
+
+  def readiness(self) -> Dict[str, Any]:
+    warming_up = self._warmup_task is not None and not self._warmup_task.done()
+    if not warming_up and not (self.model_ready and self.db_ready):
+      if time.monotonic() - self._rewarm_at >= self.warmup_retry_seconds:
+        self._rewarm_at = time.monotonic()
+        self._warmup_task = asyncio.create_task(self._rewarm())
+    return {
+      "ready": not warming_up and self.model_ready and self.db_ready,
+      "warming_up": warming_up,
+      "model": self.model_ready,
+      "db": self.db_ready,
+    }
+
+  def project_version(self, project_id: str) -> int:
+    return self.project_versions.get(project_id, 0)
+
+  def bump_project_version(self, project_id: str):
+    self.project_versions[project_id] = self.project_version(project_id) + 1
+    self.corpus_version += 1
+    self.vector_index.invalidate(project_id)
+
+  def _load_documents(self, source: Union[str, bytes]) -> List[Document]:
+    import docx2txt
+    from langchain_community.document_loaders import Docx2txtLoader
+
+    if isinstance(source, bytes):
+      # In-memory uploads are parsed straight from the buffer without touching disk
+      content = docx2txt.process(io.BytesIO(source))
+      return [Document(page_content=content, metadata={"source": "upload"})]
+    return Docx2txtLoader(source).load()
+
+  def prepare_chunks(self, project_id: str, document: str, source: Union[str, bytes], known_hashes: Optional[set] = None, progress: Optional[Callable[[str, float, Dict[str, float]], None]] = None):
+    # CPU-bound part of the ingestion (loading, chunking, embedding), safe to run in a worker process
+    timings = {}
+
+    def report(stage: str, fraction: float):
+      if progress:
+        progress(stage, fraction, timings)
 
-  async def ingest_docx(self, project_id: str, file_path: str):
-    overall_start = time.perf_counter()
-    
     # 1. Loading the document
+    report("loading", 0.0)
     start_time = time.perf_counter()
-    loader = Docx2txtLoader(file_path)
-    documents = loader.load()
+    documents = self._load_documents(source)
     intermediate_docs = self.base_splitter.split_documents(documents)
-    load_duration = time.perf_counter() - start_time
-    logger.info(f"Step 1/3: Document loaded in {load_duration:.4f} seconds.")
+    timings["load"] = time.perf_counter() - start_time
+    logger.info(f"Step 1/3: Document loaded in {timings['load']:.4f} seconds.")
     
     # 2. Semantic Chunking
+    report("chunking", 0.0)
     start_time = time.perf_counter()
-    # Uses SemanticChunker with percentile threshold and buffer_size=3
-    chunks = self.text_splitter.split_documents(intermediate_docs)
-    # chunks = self.text_splitter.split_documents(documents)
+    # Standard deviation breakpoints over sentence embeddings, buffer_size=1
+    chunks, pooled_vectors = self.text_splitter.split_documents_with_vectors(intermediate_docs)
     for i, chunk in enumerate(chunks[:3]):
       logger.info(f"Chunk {i} length: {len(chunk.page_content)} chars. Preview: {chunk.page_content[:50]}...")
-    chunk_duration = time.perf_counter() - start_time
-    logger.info(f"Step 2/3: Semantic chunking completed in {chunk_duration:.4f} seconds. Created {len(chunks)} chunks.")
+    timings["chunking"] = time.perf_counter() - start_time
+    logger.info(f"Step 2/3: Semantic chunking completed in {timings['chunking']:.4f} seconds. Created {len(chunks)} chunks.")
     
-    # 3. Embedding generation and DB storage
+    # 3. Embedding generation (only for chunks whose content is not stored yet)
+    report("embedding", 0.0)
+    start_time = time.perf_counter()
+    known_hashes = known_hashes or set()
+    rows = []
+    seen = set()
+    for chunk_doc, pooled_vector in zip(chunks, pooled_vectors):
+      digest = chunk_hash(chunk_doc.page_content)
+      if digest in seen:
+        continue
+      seen.add(digest)
+      # Unchanged chunks keep their stored vector, so they carry no embedding
+      rows.append({
+        "project_id": project_id,
+        "document": document,
+        "content": chunk_doc.page_content,
+        "content_hash": digest,
+        "embedding": pooled_vector if self.chunk_vector_mode == "pooled" and digest not in known_hashes else None
+      })
+
+    pending = [row for row in rows if row["embedding"] is None and row["content_hash"] not in known_hashes]
+    logger.info(
+      f"Step 3/3: {len(pending)} chunks to embed, {len(rows) - len(pending)} reused "
+      f"(chunk vector mode: {self.chunk_vector_mode})."
+    )
+    for batch_start in range(0, len(pending), self.embed_batch_size):
+      batch = pending[batch_start:batch_start + self.embed_batch_size]
+      batch_time = time.perf_counter()
+
+      # Generate embeddings using all-mpnet-base-v2 model (768 dimensions) in one forward pass per batch
+      contextual_texts = [contextual_text(project_id, row["content"]) for row in batch]
+      vectors = self.embeddings.embed_documents(contextual_texts)
+      for row, vector in zip(batch, vectors):
+        row["embedding"] = vector
+
+      batch_duration = time.perf_counter() - batch_time
+      logger.info(
+        f"Step 3/3: Embedded batch {batch_start // self.embed_batch_size + 1} "
+        f"({len(batch)} chunks) in {batch_duration:.4f} seconds, "
+        f"{len(batch) / batch_duration if batch_duration else 0.0:.1f} chunks/sec."
+      )
+      report("embedding", (batch_start + len(batch)) / len(pending))
+
+    timings["embedding"] = time.perf_counter() - start_time
+    return rows, timings
+
+  async def get_chunk_hashes(self, project_id: str, document: str) -> set:
+    async with self.async_session() as session:
+      # Vectors from another backend or chunk vector mode cannot be reused, so nothing counts as known
+      stored_space = await session.scalar(select(Project.embedding_model).where(Project.id == project_id))
+      if stored_space is not None and stored_space != self.vector_space:
+        return set()
+      result = await session.execute(
+        select(ProjectChunk.content_hash).where(ProjectChunk.project_id == project_id, ProjectChunk.document == document)
+      )
+      return {row[0] for row in result.all() if row[0]}
+
+  async def store_chunks(self, project_id: str, document: str, rows: List[Dict[str, Any]], tsvector_mode: Optional[str] = None):
+    # Replaces the chunk set of one document of the project with `rows` in one transaction:
+    # new hashes are inserted, vanished ones deleted, unchanged rows are left untouched.
+    # Chunks of the project's other documents are only touched to re-embed them after a model switch.
     start_time = time.perf_counter()
+    tsvector_mode = tsvector_mode or self.tsvector_mode
+    inline = False
+    bulk = False
+    new_hashes = {row["content_hash"] for row in rows}
     async with self.async_session() as session:
-      for chunk_doc in chunks:
-        text_content = chunk_doc.page_content
-
-        # Generate embedding using all-mpnet-base-v2 model (768 dimensions)
-        contextual_text = f"Проект: {project_id}. Зміст: {chunk_doc.page_content}"
-        vector = self.embeddings.embed_query(contextual_text)
-
-        # Prepare data for Hybrid Search (Vector + TSVector)
-        db_chunk = ProjectChunk(
-          project_id=project_id,
-          content=text_content,
-          embedding=vector
+      async with session.begin():
+        # Serializes concurrent re-ingestion of the same project
+        await session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:project_id))"), {"project_id": project_id})
+
+        result = await session.execute(
+          select(ProjectChunk.content_hash).where(ProjectChunk.project_id == project_id, ProjectChunk.document == document)
+        )
+        stored_hashes = {row[0] for row in result.all()}
+
+        stored_space = await session.scalar(select(Project.embedding_model).where(Project.id == project_id))
+        respace = stored_space is not None and stored_space != self.vector_space
+        if respace:
+          # Backend or chunk vector mode changed: every chunk of the document is replaced with a fresh vector
+          logger.info(f"Project '{project_id}' was embedded as '{stored_space}', re-embedding as '{self.vector_space}'.")
+          stale_hashes = set(stored_hashes)
+        else:
+          stale_hashes = stored_hashes - new_hashes
+        deleted_sizes = []
+        if stale_hashes:
+          result = await session.execute(
+            delete(ProjectChunk).where(
+              ProjectChunk.project_id == project_id,
+              ProjectChunk.document == document,
+              ProjectChunk.content_hash.in_(stale_hashes)
+            ).returning(func.octet_length(ProjectChunk.content))
+          )
+          deleted_sizes = [size or 0 for size in result.scalars().all()]
+
+        to_insert = rows if respace else [row for row in rows if row["content_hash"] not in stored_hashes]
+        missing_vectors = [row for row in to_insert if row["embedding"] is None]
+        if missing_vectors:
+          # Stored copy vanished after the hashes were read (concurrent delete), so these are embedded now
+          logger.warning(f"Re-embedding {len(missing_vectors)} chunks of '{project_id}' whose stored vector is gone.")
+          vectors = await asyncio.to_thread(
+            self.embeddings.embed_documents, [contextual_text(project_id, row["content"]) for row in missing_vectors]
+          )
+          for row, vector in zip(missing_vectors, vectors):
+            row["embedding"] = vector
+        bulk = len(to_insert) >= self.bulk_insert_min_rows
+        inline = tsvector_mode == "inline" or (tsvector_mode == "auto" and bulk)
+        if bulk:
+          # Lets the GIN indexes absorb the load as a batch instead of row-by-row posting tree inserts
+          await session.execute(text(f"SET LOCAL gin_pending_list_limit = {int(self.gin_pending_list_kb)}"))
+        if to_insert and inline:
+          await self._insert_inline_tsvector(session, to_insert)
+        elif to_insert:
+          await session.execute(insert(ProjectChunk), to_insert)
+
+        if respace and stored_space.split("#")[0] != self.embeddings.model_key:
+          # Other documents would otherwise stay in the old model's vector space
+          await self._reembed_other_documents(session, project_id, document)
+
+        await self._update_project_stats(
+          session, project_id,
+          len(to_insert) - len(deleted_sizes),
+          sum(len(row["content"].encode("utf-8")) for row in to_insert) - sum(deleted_sizes)
         )
-        session.add(db_chunk)
-      await session.commit()
+
+    if to_insert or stale_hashes:
+      self.bump_project_version(project_id)
+    if bulk:
+      await self._flush_gin_pending_list(project_id)
 
     db_duration = time.perf_counter() - start_time
-    total_duration = time.perf_counter() - overall_start
-    
-    logger.info(f"Step 3/3: Database indexing (embedding + tsvector) finished in {db_duration:.4f} seconds.")
-    logger.info(f"TOTAL processing time for project '{project_id}': {total_duration:.4f} seconds.")
-    return len(chunks)
-  
+    stats = {
+      "total": len(rows),
+      "inserted": len(to_insert),
+      "deleted": len(stale_hashes),
+      "reused": len(rows) - len(to_insert),
+      "reembedded": len(missing_vectors),
+    }
+    logger.info(
+      f"Step 3/3: Database indexing (tsvector, {'inline' if inline else 'trigger'}) for project '{project_id}' ('{document}') finished in {db_duration:.4f} seconds, "
+      f"{len(to_insert) / db_duration if db_duration else 0.0:.1f} chunks/sec. "
+      f"Inserted {stats['inserted']}, deleted {stats['deleted']}, reused {stats['reused']}."
+    )
+    return stats
+
+  async def _reembed_other_documents(self, session: AsyncSession, project_id: str, document: str):
+    # Their source files are not at hand, so they get project-prefixed vectors of the stored content
+    result = await session.execute(
+      select(ProjectChunk.id, ProjectChunk.content)
+      .where(ProjectChunk.project_id == project_id, ProjectChunk.document != document)
+      .order_by(ProjectChunk.id)
+    )
+    chunks = result.all()
+    for batch_start in range(0, len(chunks), self.embed_batch_size):
+      batch = chunks[batch_start:batch_start + self.embed_batch_size]
+      vectors = await asyncio.to_thread(
+        self.embeddings.embed_documents, [contextual_text(project_id, content or "") for _, content in batch]
+      )
+      # Bulk UPDATE by primary key, one executemany per batch
+      await session.execute(
+        update(ProjectChunk),
+        [{"id": chunk_id, "embedding": vector} for (chunk_id, _), vector in zip(batch, vectors)]
+      )
+    if chunks:
+      logger.info(f"Re-embedded {len(chunks)} chunks of other documents of '{project_id}'.")
+
+  async def _insert_inline_tsvector(self, session: AsyncSession, to_insert: List[Dict[str, Any]]):
+    # search_vector is computed by the INSERT itself; the insert trigger's WHEN clause then skips
+    # the plpgsql call, and every row is written once
+    stmt = insert(ProjectChunk).values(
+      search_vector=func.to_tsvector('ukrainian', func.coalesce(bindparam('tsvector_source', type_=Text), ''))
+    )
+    await session.execute(stmt, [{**row, "tsvector_source": row["content"]} for row in to_insert])
+
+  async def _flush_gin_pending_list(self, project_id: str):
+    # Merges the pending list into the main GIN structure now, so searches do not scan it linearly
+    index_name = f"idx_project_chunks_search_vector_{retrieval_sql.partition_of(project_id)}"
+    try:
+      async with self.engine.connect() as conn:
+        pages = await conn.scalar(text("SELECT gin_clean_pending_list(CAST(:index_name AS regclass))"), {"index_name": index_name})
+        await conn.commit()
+      logger.info(f"Flushed {pages} GIN pending list pages of {index_name}.")
+    except Exception as e:
+      logger.warning(f"Could not flush GIN pending list of {index_name}: {e}")
+
+  async def _update_project_stats(self, session: AsyncSession, project_id: str, chunk_delta: int, bytes_delta: int):
+    # Deltas keep the update O(1); the advisory lock held by the caller serializes writers per project
+    stmt = pg_insert(Project).values(
+      id=project_id,
+      chunk_count=chunk_delta,
+      total_bytes=bytes_delta,
+      last_ingested_at=func.now(),
+      embedding_model=self.vector_space
+    )
+    stmt = stmt.on_conflict_do_update(
+      index_elements=[Project.id],
+      set_={
+        "chunk_count": Project.chunk_count + chunk_delta,
+        "total_bytes": Project.total_bytes + bytes_delta,
+        "last_ingested_at": stmt.excluded.last_ingested_at,
+        "embedding_model": stmt.excluded.embedding_model,
+      }
+    )
+    await session.execute(stmt)
+
+  async def delete_project(self, project_id: str) -> Optional[int]:
+    # Returns the number of deleted chunks, or None when the project does not exist
+    async with self.async_session() as session:
+      async with session.begin():
+        await session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:project_id))"), {"project_id": project_id})
+        result = await session.execute(delete(Project).where(Project.id == project_id).returning(Project.id))
+        if result.first() is None:
+          return None
+        result = await session.execute(delete(ProjectChunk).where(ProjectChunk.project_id == project_id))
+        deleted = result.rowcount
+
+    self.bump_project_version(project_id)
+    logger.info(f"Deleted project '{project_id}' with {deleted} chunks.")
+    return deleted
+
   async def init_db(self):
     async with self.engine.begin() as conn:
       await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
@@ -109,86 +505,349 @@ class RAGEngine:
     logging.info("DB table is created")
 
 
-  async def get_context(self, query: str, project_id: str = None, search_mode: str = "hybrid", limit: int = 5, scope: str = "project"):
-    query_vector = self.embeddings.embed_query(query)
+  async def _apply_ann_settings(self, session: AsyncSession, ef_search: Optional[int] = None, probes: Optional[int] = None):
+    # SET LOCAL only lives until the end of the session's transaction, so pooled connections stay clean
+    await session.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search or self.ef_search)}"))
+    await session.execute(text(f"SET LOCAL ivfflat.probes = {int(probes or self.probes)}"))
+    if self.iterative_scan in ("strict_order", "relaxed_order", "off"):
+      await session.execute(text(f"SET LOCAL hnsw.iterative_scan = {self.iterative_scan}"))
+      await session.execute(text(f"SET LOCAL ivfflat.iterative_scan = {'off' if self.iterative_scan == 'off' else 'relaxed_order'}"))
+
+  def _scope_filters(self, scope: str, project_id: Optional[str]):
+    # One WHERE clause per storage partition; literal predicates match the partial indexes
+    filters = []
+    for predicate, tenant_id in retrieval_sql.scope_partitions(scope, project_id):
+      clause = text(predicate)
+      filters.append(and_(clause, ProjectChunk.project_id == tenant_id) if tenant_id else clause)
+    return filters
+
+  def _top_candidates(self, build, scope_filters, sort_column: str, descending: bool = False, limit: int = 50):
+    # Each partition yields its own top-k through its own index; several are merged with UNION ALL
+    parts = [build(scope_filter).limit(limit) for scope_filter in scope_filters]
+    if len(parts) == 1:
+      return parts[0].subquery()
+    merged = union_all(*parts).subquery("partitions")
+    column = merged.c[sort_column]
+    return select(merged).order_by(column.desc() if descending else column).limit(limit).subquery()
+
+  def _scope_projects(self, scope: str, project_id: Optional[str]) -> Optional[List[str]]:
+    # Same scopes as _scope_filters, as explicit project lists; None means "not bounded to projects"
+    if scope == "project" and project_id:
+      return [project_id]
+    elif scope == "system":
+      return ["SYSTEM_REGULATIONS"]
+    elif scope == "all" and project_id:
+      return [project_id, "SYSTEM_REGULATIONS"]
+    return None
+
+  async def _load_project_vectors(self, project_id: str, max_rows: int):
+    async with self.async_session() as session:
+      # The maintained count sizes the index without scanning project_chunks
+      count = await session.scalar(select(Project.chunk_count).where(Project.id == project_id))
+      if count is None or count > max_rows:
+        return None
+      rows = (await session.execute(
+        select(ProjectChunk.id, ProjectChunk.content, ProjectChunk.embedding)
+        .where(ProjectChunk.project_id == project_id, ProjectChunk.embedding.isnot(None))
+        .order_by(ProjectChunk.id)
+      )).all()
+    return [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]
+
+  def _ts_query_parts(self, query: str):
+    clean_query = query.replace('?', '').replace('!', '').replace('(', '').replace(')', '')
+    words = [w for w in clean_query.split() if len(w) > 2]
+    ts_query_string = " | ".join(words) if words else ""
+
+    numbers = re.findall(r'\d+(?:\.\d+)?', clean_query)
+    if numbers:
+      num_query = " & ".join(numbers)
+      if ts_query_string:
+        ts_query_string = f"({num_query}) & ({ts_query_string})"
+      else:
+        ts_query_string = num_query
+
+    if ts_query_string:
+      return "to_tsquery", ts_query_string
+    return "websearch_to_tsquery", query
+
+  def _ts_query(self, query: str):
+    function_name, argument = self._ts_query_parts(query)
+    return getattr(func, function_name)('ukrainian', argument)
+
+  async def _hybrid_sql(self, session: AsyncSession, query: str, query_vector: List[float], scope_filters, limit: int):
+    # Both candidate lists and the RRF fusion run in one statement; only `limit` rows come back
+    distance = ProjectChunk.embedding.cosine_distance(query_vector)
+    vec_inner = self._top_candidates(
+      lambda scope_filter: select(ProjectChunk.id, distance.label("distance")).where(scope_filter).order_by(distance),
+      scope_filters, "distance"
+    )
+    ts_query = self._ts_query(query)
+    rank_cd = func.ts_rank_cd(ProjectChunk.search_vector, ts_query)
+    kw_inner = self._top_candidates(
+      lambda scope_filter: select(ProjectChunk.id, rank_cd.label("rank_cd")).where(
+        ProjectChunk.search_vector.op('@@')(ts_query), scope_filter
+      ).order_by(rank_cd.desc()),
+      scope_filters, "rank_cd", descending=True
+    )
+
+    vec = select(
+      vec_inner.c.id, vec_inner.c.distance,
+      func.row_number().over(order_by=vec_inner.c.distance).label("rank")
+    ).cte("vec")
+    kw = select(
+      kw_inner.c.id,
+      func.row_number().over(order_by=kw_inner.c.rank_cd.desc()).label("rank")
+    ).cte("kw")
+
+    # Ties are broken like rrf_merge: vector hits in vector order, then keyword-only hits
+    fused = self.retriever.rrf_select(vec, kw)
+    order = (fused.selected_columns.rrf.desc(), fused.selected_columns.vec_rank.asc().nulls_last(), fused.selected_columns.kw_rank.asc())
+    fused = fused.order_by(*order).limit(limit).subquery("fused")
+
+    stmt = select(ProjectChunk.id, ProjectChunk.project_id, ProjectChunk.content, fused.c.score).join(
+      fused, ProjectChunk.id == fused.c.id
+    ).order_by(fused.c.rrf.desc(), fused.c.vec_rank.asc().nulls_last(), fused.c.kw_rank.asc())
+    return [RetrievedChunk(*row) for row in (await session.execute(stmt)).all()]
+
+  async def _search_orm(self, query, query_vector, project_id, search_mode, limit, scope, ef_search, probes, fusion):
+    scope_filters = self._scope_filters(scope, project_id)
 
     async with self.async_session() as session:
       vec_res = []
       key_res = []
 
-      # 1. Vector search (Cosine Distance)
+      if search_mode == "hybrid" and fusion == "sql":
+        await self._apply_ann_settings(session, ef_search, probes)
+        return await self._hybrid_sql(session, query, query_vector, scope_filters, limit)
+
+      # 1. Vector search (Cosine Distance, served by the HNSW/IVFFlat index)
       if search_mode in ["vector", "hybrid"]:
-        vec_stmt = select(ProjectChunk, ProjectChunk.embedding.cosine_distance(query_vector).label("distance"))
-
-        if scope == "project" and project_id:
-          vec_stmt = vec_stmt.where(ProjectChunk.project_id == project_id)
-        elif scope == "system":
-          vec_stmt = vec_stmt.where(ProjectChunk.project_id == "SYSTEM_REGULATIONS")
-        elif scope == "all" and project_id:
-          vec_stmt = vec_stmt.where(or_(
-            ProjectChunk.project_id == project_id,
-            ProjectChunk.project_id == "SYSTEM_REGULATIONS"
-          ))
-
-        vec_stmt = vec_stmt.order_by("distance").limit(50)
-        result = await session.execute(vec_stmt)
-        for chunk, dist in result.all():
-          chunk.score = 1 - dist
-          vec_res.append(chunk)
+        await self._apply_ann_settings(session, ef_search, probes)
+        distance = ProjectChunk.embedding.cosine_distance(query_vector)
+        candidates = self._top_candidates(
+          lambda scope_filter: select(
+            ProjectChunk.id, ProjectChunk.project_id, ProjectChunk.content,
+            (1 - distance).label("score"), distance.label("distance")
+          ).where(scope_filter).order_by(distance),
+          scope_filters, "distance"
+        )
+        vec_stmt = select(
+          candidates.c.id, candidates.c.project_id, candidates.c.content, candidates.c.score
+        ).order_by(candidates.c.distance)
+        vec_res = [RetrievedChunk(*row) for row in (await session.execute(vec_stmt)).all()]
       
       # 2. Full text search (BM25-like)
       if search_mode in ["keyword", "hybrid"]:
-        clean_query = query.replace('?', '').replace('!', '').replace('(', '').replace(')', '')
-        words = [w for w in clean_query.split() if len(w) > 2]
-        ts_query_string = " | ".join(words) if words else ""
-
-        numbers = re.findall(r'\d+(?:\.\d+)?', clean_query)
-        if numbers:
-          num_query = " & ".join(numbers)
-          if ts_query_string:
-            ts_query_string = f"({num_query}) & ({ts_query_string})"
-          else:
-            ts_query_string = num_query
-
-        if ts_query_string:
-          ts_query = func.to_tsquery('ukrainian', ts_query_string)
-        else:
-          ts_query = func.websearch_to_tsquery('ukrainian', query)
-        keyword_stmt = select(ProjectChunk).where(
-          ProjectChunk.search_vector.op('@@')(ts_query)
-        ).order_by(
-          func.ts_rank_cd(ProjectChunk.search_vector, ts_query).desc()
-        ).limit(50)
-
-        if scope == "project" and project_id:
-          keyword_stmt = keyword_stmt.where(ProjectChunk.project_id == project_id)
-        elif scope == "system":
-          keyword_stmt = keyword_stmt.where(ProjectChunk.project_id == "SYSTEM_REGULATIONS")
-        elif scope == "all" and project_id:
-          keyword_stmt = keyword_stmt.where(or_(
-            ProjectChunk.project_id == project_id,
-            ProjectChunk.project_id == "SYSTEM_REGULATIONS"
-          ))
-        key_res = (await session.execute(keyword_stmt)).scalars().all()
-
-        for chunk in key_res:
-          chunk.score = 0.7
-
-      if search_mode == "vector":
-        final_docs = vec_res[:limit]
-      elif search_mode == "keyword":
-        final_docs = key_res[:limit]
-      else:
-        # HybridRetriever for RRF
-        final_docs = await self.retriever.rrf_merge(vec_res, key_res)
-        final_docs = final_docs[:limit]
+        ts_query = self._ts_query(query)
+        rank_cd = func.ts_rank_cd(ProjectChunk.search_vector, ts_query)
+        candidates = self._top_candidates(
+          lambda scope_filter: select(
+            ProjectChunk.id, ProjectChunk.project_id, ProjectChunk.content, rank_cd.label("rank_cd")
+          ).where(ProjectChunk.search_vector.op('@@')(ts_query), scope_filter).order_by(rank_cd.desc()),
+          scope_filters, "rank_cd", descending=True
+        )
+        keyword_stmt = select(
+          candidates.c.id, candidates.c.project_id, candidates.c.content
+        ).order_by(candidates.c.rank_cd.desc())
+        key_res = [RetrievedChunk(*row) for row in (await session.execute(keyword_stmt)).all()]
+
+    return await self._merge(vec_res, key_res, search_mode, limit)
+
+  async def _merge(self, vec_res: List[RetrievedChunk], key_res: List[RetrievedChunk], search_mode: str, limit: int):
+    # A chunk found by both searches is the same object, and keyword hits report 0.7
+    by_id = {c.id: c for c in vec_res}
+    key_res = [by_id.get(c.id, c) for c in key_res]
+    for chunk in key_res:
+      chunk.score = 0.7
+
+    if search_mode == "vector":
+      return vec_res[:limit]
+    elif search_mode == "keyword":
+      return key_res[:limit]
+    # HybridRetriever for RRF
+    final_docs = await self.retriever.rrf_merge(vec_res, key_res)
+    return final_docs[:limit]
+
+  async def _get_fast_pool(self):
+    if self._fast_pool is not None:
+      return self._fast_pool
+    async with self._fast_pool_lock:
+      if self._fast_pool is None:
+        import asyncpg
+        from pgvector.asyncpg import register_vector
+
+        dsn = self.url.replace("postgresql+asyncpg://", "postgresql://")
+        async def init_connection(conn):
+          await register_vector(conn)
+          await conn.fetchval(PRIMING_QUERY)
+
+        self._fast_pool = await asyncpg.create_pool(
+          dsn,
+          min_size=min(self.pool_min_warm, int(os.getenv("RETRIEVAL_POOL_SIZE", "10"))),
+          max_size=int(os.getenv("RETRIEVAL_POOL_SIZE", "10")),
+          init=init_connection
+        )
+    return self._fast_pool
+
+  async def _search_asyncpg(self, query, query_vector, project_id, search_mode, limit, scope, ef_search, probes, fusion):
+    # Query vectors go over the wire in pgvector's binary format, rows come back as plain records
+    vector = np.asarray(query_vector, dtype=np.float32)
+    ts_function, ts_argument = self._ts_query_parts(query)
+    pool = await self._get_fast_pool()
+
+    async with pool.acquire() as conn:
+      async with conn.transaction():
+        settings = [
+          f"SET LOCAL hnsw.ef_search = {int(ef_search or self.ef_search)}",
+          f"SET LOCAL ivfflat.probes = {int(probes or self.probes)}",
+        ]
+        if self.iterative_scan in ("strict_order", "relaxed_order", "off"):
+          settings.append(f"SET LOCAL hnsw.iterative_scan = {self.iterative_scan}")
+          settings.append(f"SET LOCAL ivfflat.iterative_scan = {'off' if self.iterative_scan == 'off' else 'relaxed_order'}")
+        await conn.execute("; ".join(settings))
+
+        if search_mode == "hybrid" and fusion == "sql":
+          sql, args = retrieval_sql.hybrid_sql(
+            vector, ts_function, ts_argument, scope, project_id, limit, self.retriever.k, self.retriever.vector_weight
+          )
+          return [RetrievedChunk(*record) for record in await conn.fetch(sql, *args)]
+
+        vec_res = []
+        key_res = []
+        if search_mode in ["vector", "hybrid"]:
+          sql, args = retrieval_sql.vector_sql(vector, scope, project_id, 50)
+          vec_res = [RetrievedChunk(*record) for record in await conn.fetch(sql, *args)]
+        if search_mode in ["keyword", "hybrid"]:
+          sql, args = retrieval_sql.keyword_sql(ts_function, ts_argument, scope, project_id, 50)
+          key_res = [RetrievedChunk(*record) for record in await conn.fetch(sql, *args)]
+
+    return await self._merge(vec_res, key_res, search_mode, limit)
+
+  async def get_context(
+    self,
+    query: str,
+    project_id: str = None,
+    search_mode: str = "hybrid",
+    limit: int = 5,
+    scope: str = "project",
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    fusion: Optional[str] = None,
+    driver: Optional[str] = None
+  ):
+    key, versions = self._cache_entry(query, project_id, search_mode, limit, scope, ef_search, probes, fusion, driver)
+    cached = self.result_cache.get(key, versions)
+    if cached is not None:
+      return cached
+
+    query_vector = await self.query_embedder.embed_query(query)
+    results = await self._search(query, query_vector, project_id, search_mode, limit, scope, ef_search, probes, fusion, driver)
+    self.result_cache.put(key, versions, results)
+    return results
+
+  def _cache_entry(self, query, project_id, search_mode, limit, scope, ef_search, probes, fusion, driver):
+    # Versions are read before searching, so a result racing an ingestion is stored already stale
+    key = (
+      normalize_query(query), project_id, scope, search_mode, limit,
+      ef_search, probes, fusion or self.hybrid_fusion, driver or self.retrieval_driver
+    )
+    project_ids = self._scope_projects(scope, project_id)
+    if project_ids:
+      versions = tuple(self.project_version(pid) for pid in project_ids)
+    else:
+      versions = self.corpus_version
+    return key, versions
+
+  async def _search(self, query, query_vector, project_id, search_mode, limit, scope, ef_search, probes, fusion, driver):
+    # "sql": RRF inside Postgres in a single round trip; "python": HybridRetriever.rrf_merge
+    fusion = fusion or self.hybrid_fusion
+    driver = driver or self.retrieval_driver
+
+    search = self._search_asyncpg if driver == "asyncpg" else self._search_orm
+
+    # Hot projects answer the vector branch from memory; only the keyword branch goes to Postgres
+    project_ids = self._scope_projects(scope, project_id)
+    if search_mode in ["vector", "hybrid"] and self.vector_index.enabled and project_ids:
+      vec_rows = await self.vector_index.search(project_ids, query_vector, 50)
+      if vec_rows is not None:
+        vec_res = [RetrievedChunk(*row) for row in vec_rows]
+        key_res = []
+        if search_mode == "hybrid":
+          key_res = await search(query, query_vector, project_id, "keyword", 50, scope, ef_search, probes, fusion)
+        final_docs = await self._merge(vec_res, key_res, search_mode, limit)
+        return [c.to_dict() for c in final_docs]
+
+    final_docs = await search(query, query_vector, project_id, search_mode, limit, scope, ef_search, probes, fusion)
+    return [c.to_dict() for c in final_docs]
+
+  async def get_context_many(
+    self,
+    queries: List[Union[str, Dict[str, Any]]],
+    project_id: str = None,
+    search_mode: str = "hybrid",
+    limit: int = 5,
+    scope: str = "project",
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    fusion: Optional[str] = None,
+    driver: Optional[str] = None
+  ) -> List[List[Dict[str, Any]]]:
+    # Each query is a string or a dict with "query" plus per-query overrides of
+    # project_id/search_mode/limit/scope. Results are aligned with the input order.
+    if not queries:
+      return []
+    specs = []
+    for item in queries:
+      spec = {"query": item} if isinstance(item, str) else dict(item)
+      spec.setdefault("project_id", project_id)
+      spec.setdefault("search_mode", search_mode)
+      spec.setdefault("limit", limit)
+      spec.setdefault("scope", scope)
+      specs.append(spec)
+
+    results: List[Optional[List[Dict[str, Any]]]] = [None] * len(specs)
+    pending = []
+    for index, spec in enumerate(specs):
+      key, versions = self._cache_entry(
+        spec["query"], spec["project_id"], spec["search_mode"], spec["limit"], spec["scope"],
+        ef_search, probes, fusion, driver
+      )
+      results[index] = self.result_cache.get(key, versions)
+      if results[index] is None:
+        pending.append((index, spec, key, versions))
+    if not pending:
+      return results
+
+    # One batched forward pass for all uncached query texts
+    vectors = await asyncio.to_thread(self.embeddings.embed_documents, [spec["query"] for _, spec, _, _ in pending])
+
+    # Searches run concurrently, each on its own pooled connection
+    semaphore = asyncio.Semaphore(self.many_concurrency)
+
+    async def run(index, spec, key, versions, vector):
+      async with semaphore:
+        results[index] = await self._search(
+          spec["query"], vector, spec["project_id"], spec["search_mode"], spec["limit"], spec["scope"],
+          ef_search, probes, fusion, driver
+        )
+        self.result_cache.put(key, versions, results[index])
+
+    await asyncio.gather(*(run(*item, vector) for item, vector in zip(pending, vectors)))
+    return results
 
-      return [{"id": str(c.id), "content": c.content, "source": c.project_id, "score": getattr(c, "score", 0.0)} for c in final_docs]
+  async def close(self):
+    if self._warmup_task is not None:
+      self._warmup_task.cancel()
+    await self.query_embedder.close()
+    if self._fast_pool is not None:
+      await self._fast_pool.close()
+      self._fast_pool = None
+    await self.engine.dispose()
 
   async def get_all_projects(self):
     async with self.async_session() as session:
       try:
-        stmt = select(ProjectChunk.project_id).distinct() 
+        stmt = select(Project.id).order_by(Project.id)
         result = await session.execute(stmt)
         
         return [row[0] for row in result.all()]
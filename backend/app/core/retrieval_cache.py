@@ -0,0 +1,52 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+def normalize_query(query: str) -> str:
+  # Whitespace never changes the tsquery or the embedding, so it is folded out of the key
+  return " ".join(query.split())
+
+class RetrievalCache:
+  # Bounded LRU of final get_context results. Every entry remembers the versions of the projects
+  # it was retrieved from and is only served while those versions are unchanged and its TTL holds.
+  def __init__(self, max_items: Optional[int] = None, ttl_seconds: Optional[float] = None):
+    self.max_items = max_items if max_items is not None else int(os.getenv("RETRIEVAL_CACHE_MAX_ITEMS", "2048"))
+    self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "600"))
+    self._entries: "OrderedDict[Hashable, Tuple[float, Any, List[Dict[str, Any]]]]" = OrderedDict()
+    self.counters = {"hits": 0, "misses": 0, "stale": 0, "expired": 0}
+
+  def get(self, key: Hashable, versions: Any) -> Optional[List[Dict[str, Any]]]:
+    entry = self._entries.get(key)
+    if entry is None:
+      self.counters["misses"] += 1
+      return None
+    stored_at, stored_versions, results = entry
+    if stored_versions != versions or time.monotonic() - stored_at > self.ttl_seconds:
+      del self._entries[key]
+      self.counters["stale" if stored_versions != versions else "expired"] += 1
+      self.counters["misses"] += 1
+      return None
+    self._entries.move_to_end(key)
+    self.counters["hits"] += 1
+    # Callers get their own dicts so they can annotate results without touching the cache
+    return [dict(r) for r in results]
+
+  def put(self, key: Hashable, versions: Any, results: List[Dict[str, Any]]):
+    if self.max_items <= 0:
+      return
+    self._entries[key] = (time.monotonic(), versions, [dict(r) for r in results])
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.max_items:
+      self._entries.popitem(last=False)
+
+  def clear(self):
+    self._entries.clear()
+
+  def stats(self) -> Dict[str, Any]:
+    lookups = self.counters["hits"] + self.counters["misses"]
+    return {
+      **self.counters,
+      "items": len(self._entries),
+      "hit_rate": self.counters["hits"] / lookups if lookups else 0.0
+    }
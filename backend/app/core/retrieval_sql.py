@@ -0,0 +1,147 @@
+from typing import Any, List, Optional, Tuple
+
+# Raw SQL for the asyncpg retrieval fast path. Only id, project_id, content and the score are
+# selected, so the 768-dim embedding column never leaves the database. Every builder returns
+# (sql, args) with positional $n placeholders; identical SQL text hits asyncpg's prepared
+# statement cache on every later call.
+
+TS_FUNCTIONS = ("to_tsquery", "websearch_to_tsquery")
+CANDIDATES = 50
+
+# The shared corpora and tenant projects live in separate partial HNSW/GIN indexes. Queries repeat
+# a partition's predicate verbatim as a literal, which is what lets the planner pick its index
+# even for prepared statements with generic plans.
+SYSTEM_PROJECTS = ("SYSTEM_REGULATIONS", "TEMPLATE_TZ")
+PARTITIONS = {
+  "regulations": "project_id = 'SYSTEM_REGULATIONS'",
+  "template": "project_id = 'TEMPLATE_TZ'",
+  "tenants": "project_id NOT IN ('SYSTEM_REGULATIONS', 'TEMPLATE_TZ')",
+}
+
+def partition_of(project_id: str) -> str:
+  if project_id == "SYSTEM_REGULATIONS":
+    return "regulations"
+  elif project_id == "TEMPLATE_TZ":
+    return "template"
+  return "tenants"
+
+def _project_partition(project_id: str) -> Tuple[str, Optional[str]]:
+  # (literal partition predicate, tenant project_id to bind or None)
+  name = partition_of(project_id)
+  return PARTITIONS[name], project_id if name == "tenants" else None
+
+def scope_partitions(scope: str, project_id: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+  # Same scopes as before, as one entry per partition a query has to visit
+  if scope == "project" and project_id:
+    return [_project_partition(project_id)]
+  elif scope == "system":
+    return [_project_partition("SYSTEM_REGULATIONS")]
+  elif scope == "all" and project_id:
+    return list(dict.fromkeys([_project_partition(project_id), _project_partition("SYSTEM_REGULATIONS")]))
+  return [(predicate, None) for predicate in PARTITIONS.values()]
+
+class _Params:
+  def __init__(self):
+    self.values: List[Any] = []
+
+  def add(self, value: Any) -> str:
+    self.values.append(value)
+    return f"${len(self.values)}"
+
+def _scope_clauses(params: _Params, scope: str, project_id: Optional[str]) -> List[str]:
+  clauses = []
+  for predicate, tenant_id in scope_partitions(scope, project_id):
+    clauses.append(f"{predicate} AND project_id = {params.add(tenant_id)}" if tenant_id else predicate)
+  return clauses
+
+def _union_top(parts: List[str], order: str) -> str:
+  # A top-k list per partition, merged with UNION ALL and cut to the global top-k
+  if len(parts) == 1:
+    return parts[0]
+  branches = " UNION ALL ".join(f"({part})" for part in parts)
+  return f"SELECT * FROM ({branches}) parts ORDER BY {order} LIMIT {CANDIDATES}"
+
+def _vector_candidates(vector: str, wheres: List[str]) -> str:
+  return _union_top([f"""
+    SELECT id, embedding <=> {vector} AS distance
+    FROM project_chunks
+    WHERE {where}
+    ORDER BY embedding <=> {vector}
+    LIMIT {CANDIDATES}
+  """ for where in wheres], "distance")
+
+def _keyword_candidates(ts_query: str, wheres: List[str]) -> str:
+  return _union_top([f"""
+    SELECT id, ts_rank_cd(search_vector, {ts_query}) AS rank_cd
+    FROM project_chunks
+    WHERE search_vector @@ {ts_query} AND {where}
+    ORDER BY rank_cd DESC
+    LIMIT {CANDIDATES}
+  """ for where in wheres], "rank_cd DESC")
+
+def _ts_query(params: _Params, ts_function: str, ts_argument: str) -> str:
+  if ts_function not in TS_FUNCTIONS:
+    raise ValueError(f"Unsupported tsquery function '{ts_function}'")
+  return f"{ts_function}('ukrainian', {params.add(ts_argument)})"
+
+def vector_sql(query_vector, scope: str, project_id: Optional[str], limit: int) -> Tuple[str, List[Any]]:
+  params = _Params()
+  vector = params.add(query_vector)
+  wheres = _scope_clauses(params, scope, project_id)
+  sql = f"""
+    SELECT c.id, c.project_id, c.content, 1 - v.distance AS score
+    FROM ({_vector_candidates(vector, wheres)}) v
+    JOIN project_chunks c ON c.id = v.id
+    ORDER BY v.distance
+    LIMIT {params.add(limit)}
+  """
+  return sql, params.values
+
+def keyword_sql(ts_function: str, ts_argument: str, scope: str, project_id: Optional[str], limit: int) -> Tuple[str, List[Any]]:
+  params = _Params()
+  ts_query = _ts_query(params, ts_function, ts_argument)
+  wheres = _scope_clauses(params, scope, project_id)
+  sql = f"""
+    SELECT c.id, c.project_id, c.content, 0.7::float8 AS score
+    FROM ({_keyword_candidates(ts_query, wheres)}) k
+    JOIN project_chunks c ON c.id = k.id
+    ORDER BY k.rank_cd DESC
+    LIMIT {params.add(limit)}
+  """
+  return sql, params.values
+
+def hybrid_sql(
+  query_vector, ts_function: str, ts_argument: str, scope: str, project_id: Optional[str],
+  limit: int, k_constant: int, vector_weight: float
+) -> Tuple[str, List[Any]]:
+  # Mirrors HybridRetriever.rrf_select: same fusion formula, reported score and tie order
+  params = _Params()
+  vector = params.add(query_vector)
+  ts_query = _ts_query(params, ts_function, ts_argument)
+  wheres = _scope_clauses(params, scope, project_id)
+  k = params.add(float(k_constant))
+  weight = params.add(float(vector_weight))
+  sql = f"""
+    WITH vec AS (
+      SELECT id, distance, row_number() OVER (ORDER BY distance) AS rank
+      FROM ({_vector_candidates(vector, wheres)}) v
+    ), kw AS (
+      SELECT id, row_number() OVER (ORDER BY rank_cd DESC) AS rank
+      FROM ({_keyword_candidates(ts_query, wheres)}) k
+    ), fused AS (
+      SELECT
+        coalesce(vec.id, kw.id) AS id,
+        coalesce({weight}::float8 / ({k}::float8 + vec.rank), 0) + coalesce(1.0::float8 / ({k}::float8 + kw.rank), 0) AS rrf,
+        CASE WHEN kw.id IS NOT NULL THEN 0.7::float8 ELSE 1 - vec.distance END AS score,
+        vec.rank AS vec_rank,
+        kw.rank AS kw_rank
+      FROM vec FULL OUTER JOIN kw ON vec.id = kw.id
+      ORDER BY rrf DESC, vec_rank ASC NULLS LAST, kw_rank ASC
+      LIMIT {params.add(limit)}
+    )
+    SELECT c.id, c.project_id, c.content, f.score
+    FROM fused f
+    JOIN project_chunks c ON c.id = f.id
+    ORDER BY f.rrf DESC, f.vec_rank ASC NULLS LAST, f.kw_rank ASC
+  """
+  return sql, params.values
@@ -0,0 +1,79 @@
+import asyncio
+from typing import Dict, List, Any, Tuple
+
+from app.core.rag_logic import rag_engine
+from app.core.templates import TZ_STRUCTURE_TEMPLATE
+from app.core.logger import logger
+
+REGULATIONS_PROJECT = "SYSTEM_REGULATIONS"
+REFERENCE_PROJECT = "TEMPLATE_TZ"
+
+def section_title(code: str) -> str:
+  definition = TZ_STRUCTURE_TEMPLATE.get(code)
+  return definition.get("title", "") if isinstance(definition, dict) else ""
+
+def regulation_query(code: str) -> str:
+  return f"Вимоги до змісту розділу '{code} {section_title(code)}' згідно Постанови 205 Додаток 3"
+
+def reference_query(code: str) -> str:
+  return f"Приклад змісту розділу '{code} {section_title(code)}' з технічними деталями та таблицями"
+
+class SectionContextStore:
+  # Regulation and reference chunks depend only on the section code and the two system corpora,
+  # so they are computed once per section and reused until either corpus is re-ingested.
+  def __init__(self, engine, reg_limit: int = 3, ref_limit: int = 2):
+    self.engine = engine
+    self.reg_limit = reg_limit
+    self.ref_limit = ref_limit
+    self._entries: Dict[str, Dict[str, Any]] = {}
+    self._locks: Dict[str, asyncio.Lock] = {}
+
+  def _corpus_versions(self) -> Tuple[int, int]:
+    return (
+      self.engine.project_version(REGULATIONS_PROJECT),
+      self.engine.project_version(REFERENCE_PROJECT)
+    )
+
+  async def _build_many(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    # Regulation and reference queries for every code go through one embedding batch
+    versions = self._corpus_versions()
+    queries = []
+    for code in codes:
+      queries.append({"query": regulation_query(code), "project_id": REGULATIONS_PROJECT, "scope": "system", "limit": self.reg_limit})
+      queries.append({"query": reference_query(code), "project_id": REFERENCE_PROJECT, "scope": "project", "limit": self.ref_limit})
+    results = await self.engine.get_context_many(queries)
+    return {
+      code: {"reg": results[2 * i], "ref": results[2 * i + 1], "versions": versions}
+      for i, code in enumerate(codes)
+    }
+
+  def _is_fresh(self, code: str) -> bool:
+    entry = self._entries.get(code)
+    return entry is not None and entry["versions"] == self._corpus_versions()
+
+  async def get_many(self, codes: List[str]) -> Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    codes = list(dict.fromkeys(codes))
+    stale = [code for code in codes if not self._is_fresh(code)]
+    if stale:
+      # Locks are taken in sorted order so concurrent callers with overlapping codes cannot deadlock
+      locks = [self._locks.setdefault(code, asyncio.Lock()) for code in sorted(stale)]
+      for lock in locks:
+        await lock.acquire()
+      try:
+        stale = [code for code in stale if not self._is_fresh(code)]
+        if stale:
+          self._entries.update(await self._build_many(stale))
+      finally:
+        for lock in locks:
+          lock.release()
+    return {code: (self._entries[code]["reg"], self._entries[code]["ref"]) for code in codes}
+
+  async def get(self, code: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    return (await self.get_many([code]))[code]
+
+  async def warm(self, codes: List[str] = None):
+    codes = codes or list(TZ_STRUCTURE_TEMPLATE.keys())
+    await self.get_many(codes)
+    logger.info(f"Section context store warmed for {len(codes)} sections")
+
+section_context = SectionContextStore(rag_engine)
@@ -0,0 +1,69 @@
+import json
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import Column, String, DateTime, select, delete, func
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+
+from app.core.rag_logic import Base, rag_engine
+from app.core.templates import PROMPT_TEMPLATE_VERSION
+from app.core.logger import logger
+
+class GeneratedSection(Base):
+  # Last generated content of one TZ section of a project (the section and its subsections),
+  # together with the fingerprint of the inputs it was generated from
+  __tablename__ = 'generated_sections'
+  project_id = Column(String, primary_key=True)
+  code = Column(String, primary_key=True)
+  fingerprint = Column(String(64), nullable=False)
+  sections = Column(JSONB, nullable=False)
+  updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+def section_fingerprint(questionnaire_slice: Dict[str, Any], chunk_ids: List[str], model: str) -> str:
+  # Everything the section's prompt is built from: its questionnaire slice, the retrieved chunks,
+  # the prompt templates and the model
+  payload = {
+    "questionnaire": questionnaire_slice,
+    "chunks": sorted(chunk_ids),
+    "prompt_version": PROMPT_TEMPLATE_VERSION,
+    "model": model
+  }
+  return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+class SectionStore:
+  def __init__(self, engine):
+    self.engine = engine
+
+  async def load(self, project_id: str, codes: List[str]) -> Dict[str, Tuple[str, List[Dict[str, Any]]]]:
+    async with self.engine.async_session() as session:
+      result = await session.execute(
+        select(GeneratedSection.code, GeneratedSection.fingerprint, GeneratedSection.sections).where(
+          GeneratedSection.project_id == project_id,
+          GeneratedSection.code.in_(codes)
+        )
+      )
+      return {code: (fingerprint, sections) for code, fingerprint, sections in result.all()}
+
+  async def save(self, project_id: str, entries: Dict[str, Tuple[str, List[Dict[str, Any]]]]):
+    if not entries:
+      return
+    stmt = pg_insert(GeneratedSection).values([
+      {"project_id": project_id, "code": code, "fingerprint": fingerprint, "sections": sections}
+      for code, (fingerprint, sections) in entries.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+      index_elements=[GeneratedSection.project_id, GeneratedSection.code],
+      set_={"fingerprint": stmt.excluded.fingerprint, "sections": stmt.excluded.sections, "updated_at": func.now()}
+    )
+    async with self.engine.async_session() as session:
+      async with session.begin():
+        await session.execute(stmt)
+    logger.info(f"Stored generated sections {sorted(entries)} for project '{project_id}'")
+
+  async def delete(self, project_id: str) -> int:
+    async with self.engine.async_session() as session:
+      async with session.begin():
+        result = await session.execute(delete(GeneratedSection).where(GeneratedSection.project_id == project_id))
+        return result.rowcount
+
+section_store = SectionStore(rag_engine)
@@ -0,0 +1,106 @@
+import re
+import json
+from typing import List
+
+from pydantic import ValidationError
+
+from app.core.schemas import TZSection
+from app.core.logger import logger
+
+SECTIONS_START = re.compile(r'"sections"\s*:\s*\[')
+# Enough of the buffer tail to complete a split `"sections" : [` on the next feed
+SEARCH_OVERLAP = 64
+
+class SectionStreamParser:
+  # Incremental parser over raw model output that yields each element of the "sections" array as soon
+  # as its closing brace arrives. Every character is scanned once: surrounding prose and markdown fences
+  # are skipped by searching for the array start, then a small brace/string state machine cuts out
+  # complete objects, which are validated as TZSection. Consumed input is dropped from the buffer.
+  def __init__(self):
+    self.buffer = ""
+    self.pos = 0
+    self.state = "seek"
+    self.depth = 0
+    self.in_string = False
+    self.escaped = False
+    self.object_start = None
+    self.sections: List[TZSection] = []
+    self.errors = 0
+
+  def feed(self, text: str) -> List[TZSection]:
+    self.buffer += text
+    completed = []
+    if self.state == "seek":
+      self._seek()
+    if self.state == "array":
+      completed = self._scan()
+    self._compact()
+    return completed
+
+  def _seek(self):
+    match = SECTIONS_START.search(self.buffer, self.pos)
+    if match is None:
+      self.pos = max(self.pos, len(self.buffer) - SEARCH_OVERLAP)
+      return
+    self.pos = match.end()
+    self.state = "array"
+
+  def _scan(self) -> List[TZSection]:
+    completed = []
+    buffer = self.buffer
+    for i in range(self.pos, len(buffer)):
+      char = buffer[i]
+      if self.depth == 0:
+        # Between elements: only '{' and the closing ']' matter
+        if char == "{":
+          self.object_start = i
+          self.depth = 1
+        elif char == "]":
+          self.state = "done"
+          self.pos = i + 1
+          return completed
+        continue
+
+      if self.in_string:
+        if self.escaped:
+          self.escaped = False
+        elif char == "\\":
+          self.escaped = True
+        elif char == '"':
+          self.in_string = False
+      elif char == '"':
+        self.in_string = True
+      elif char in "{[":
+        self.depth += 1
+      elif char in "}]":
+        self.depth -= 1
+        if self.depth == 0:
+          section = self._parse(buffer[self.object_start:i + 1])
+          self.object_start = None
+          if section is not None:
+            completed.append(section)
+    self.pos = len(buffer)
+    return completed
+
+  def _parse(self, raw: str):
+    try:
+      section = TZSection(**json.loads(raw))
+    except (json.JSONDecodeError, ValidationError, TypeError) as e:
+      self.errors += 1
+      logger.warning(f"Skipping malformed streamed section: {e}")
+      return None
+    self.sections.append(section)
+    return section
+
+  def _compact(self):
+    # Keeps only the unfinished object (or the search tail), so the buffer does not grow with the output
+    keep_from = self.object_start if self.object_start is not None else self.pos
+    if keep_from > 0:
+      self.buffer = self.buffer[keep_from:]
+      self.pos -= keep_from
+      if self.object_start is not None:
+        self.object_start = 0
+
+  @property
+  def done(self) -> bool:
+    return self.state == "done"
@@ -1,3 +1,6 @@
+import json
+import hashlib
+
 MANDATORY_REGULATIONS = """
 - Закон України «Про інформацію»;
 - Закон України «Про захист інформації в ІКС»;
@@ -353,4 +356,12 @@ SYSTEM_QA_INSTRUCTION = """
 4. Якщо в контексті є суперечність — вказуй на неї.
 5. Використовуй офіційно-діловий стиль.
 6. Відповідь має бути українською мовою.
-"""
\ No newline at end of file
+"""
+
+# Part of every persisted section's fingerprint. Derived from every template above, so any edit to
+# a prompt, example or instruction regenerates the sections produced with the old wording.
+PROMPT_TEMPLATE_VERSION = hashlib.sha256(json.dumps(
+  {name: value for name, value in globals().items() if name.isupper() and isinstance(value, (str, dict, list, tuple))},
+  ensure_ascii=False,
+  sort_keys=True
+).encode("utf-8")).hexdigest()[:16]
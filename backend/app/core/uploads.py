@@ -0,0 +1,56 @@
+import asyncio
+import os
+import tempfile
+from typing import Union
+
+from fastapi import UploadFile
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_IN_MEMORY_BYTES = int(os.getenv("UPLOAD_IN_MEMORY_BYTES", str(8 * 1024 * 1024)))
+READ_CHUNK_BYTES = 1024 * 1024
+
+class UploadTooLarge(Exception):
+  pass
+
+def discard_upload(source: Union[str, bytes]):
+  if isinstance(source, str) and os.path.exists(source):
+    os.remove(source)
+
+# Returns the upload as bytes when it fits in UPLOAD_IN_MEMORY_BYTES, otherwise the path of a
+# uniquely named temp file. Disk writes are offloaded to a thread so the loop never blocks.
+async def spool_upload(file: UploadFile) -> Union[str, bytes]:
+  declared_size = getattr(file, "size", None)
+  if declared_size is not None and declared_size > MAX_UPLOAD_BYTES:
+    raise UploadTooLarge(f"File is larger than {MAX_UPLOAD_BYTES} bytes")
+
+  buffer = bytearray()
+  temp_file = None
+  total = 0
+  try:
+    while True:
+      chunk = await file.read(READ_CHUNK_BYTES)
+      if not chunk:
+        break
+      total += len(chunk)
+      if total > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"File is larger than {MAX_UPLOAD_BYTES} bytes")
+
+      if temp_file is None:
+        buffer.extend(chunk)
+        if len(buffer) <= UPLOAD_IN_MEMORY_BYTES:
+          continue
+        # Spill to disk only once the in-memory budget is exceeded
+        temp_file = tempfile.NamedTemporaryFile(prefix="upload_", suffix=".docx", delete=False)
+        chunk = bytes(buffer)
+        buffer.clear()
+      await asyncio.to_thread(temp_file.write, chunk)
+  except BaseException:
+    if temp_file is not None:
+      await asyncio.to_thread(temp_file.close)
+      discard_upload(temp_file.name)
+    raise
+
+  if temp_file is None:
+    return bytes(buffer)
+  await asyncio.to_thread(temp_file.close)
+  return temp_file.name
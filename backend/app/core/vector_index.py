@@ -0,0 +1,135 @@
+import os
+import asyncio
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.logger import logger
+
+# loader(project_id, max_rows) -> (ids, contents, vectors), or None when the project has more than max_rows chunks
+Loader = Callable[[str, int], Awaitable[Optional[Tuple[List[int], List[str], List[Any]]]]]
+
+class ProjectVectorIndex:
+  # Exact in-process cosine search for hot projects. Each project is held as one contiguous
+  # float32 matrix of unit vectors, so a query is a single matrix-vector product plus argpartition.
+  # Entries are tagged with the project version they were loaded at and reloaded after re-ingestion;
+  # the least recently used projects are evicted once the memory budget is exceeded.
+  def __init__(
+    self,
+    loader: Loader,
+    version_of: Callable[[str], int],
+    max_bytes: Optional[int] = None,
+    max_rows: Optional[int] = None,
+    enabled: Optional[bool] = None
+  ):
+    self.loader = loader
+    self.version_of = version_of
+    self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("VECTOR_INDEX_MAX_MB", "256")) * 1024 * 1024
+    self.max_rows = max_rows if max_rows is not None else int(os.getenv("VECTOR_INDEX_MAX_ROWS", "50000"))
+    self.enabled = enabled if enabled is not None else os.getenv("VECTOR_INDEX_ENABLED", "1") == "1"
+    self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    # Projects too large for the index, remembered per version so they are not re-counted on every query
+    self._skipped: Dict[str, int] = {}
+    self._locks: Dict[str, asyncio.Lock] = {}
+    self._bytes = 0
+    self.counters = {"hits": 0, "fallbacks": 0, "loads": 0, "evictions": 0}
+
+  def _fresh(self, project_id: str) -> Optional[Dict[str, Any]]:
+    entry = self._entries.get(project_id)
+    if entry is not None and entry["version"] == self.version_of(project_id):
+      self._entries.move_to_end(project_id)
+      return entry
+    return None
+
+  async def _entry(self, project_id: str) -> Optional[Dict[str, Any]]:
+    entry = self._fresh(project_id)
+    if entry is not None:
+      return entry
+    lock = self._locks.setdefault(project_id, asyncio.Lock())
+    async with lock:
+      entry = self._fresh(project_id)
+      if entry is not None:
+        return entry
+      version = self.version_of(project_id)
+      if self._skipped.get(project_id) == version:
+        return None
+      self._drop(project_id)
+
+      loaded = await self.loader(project_id, self.max_rows)
+      if loaded is None:
+        self._skipped[project_id] = version
+        return None
+      entry = self._build(loaded, version)
+      if entry["nbytes"] > self.max_bytes:
+        self._skipped[project_id] = version
+        return None
+
+      self._entries[project_id] = entry
+      self._bytes += entry["nbytes"]
+      self.counters["loads"] += 1
+      while self._bytes > self.max_bytes and len(self._entries) > 1:
+        evicted, _ = next(iter(self._entries.items()))
+        self._drop(evicted)
+        self.counters["evictions"] += 1
+      logger.info(f"Vector index loaded '{project_id}' v{version}: {len(entry['ids'])} vectors, {entry['nbytes'] / 1e6:.1f} MB")
+      return entry
+
+  def _build(self, loaded, version: int) -> Dict[str, Any]:
+    ids, contents, vectors = loaded
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1) if ids else np.zeros((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.ascontiguousarray(matrix / np.where(norms == 0, 1.0, norms))
+    ids = np.asarray(ids, dtype=np.int64)
+    nbytes = matrix.nbytes + ids.nbytes + sum(len(c.encode("utf-8")) for c in contents)
+    return {"ids": ids, "contents": contents, "matrix": matrix, "version": version, "nbytes": nbytes}
+
+  def _drop(self, project_id: str):
+    entry = self._entries.pop(project_id, None)
+    if entry is not None:
+      self._bytes -= entry["nbytes"]
+
+  async def search(self, project_ids: Sequence[str], query_vector, k: int) -> Optional[List[Tuple[int, str, str, float]]]:
+    # Returns (id, project_id, content, cosine similarity) rows in descending score order,
+    # or None when any of the projects cannot be served from memory
+    project_ids = list(dict.fromkeys(project_ids))
+    entries = []
+    for project_id in project_ids:
+      entry = await self._entry(project_id)
+      if entry is None:
+        self.counters["fallbacks"] += 1
+        return None
+      entries.append(entry)
+    self.counters["hits"] += 1
+
+    query = np.asarray(query_vector, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1.0)
+    rows = []
+    for project_id, entry in zip(project_ids, entries):
+      count = len(entry["ids"])
+      if count == 0:
+        continue
+      scores = entry["matrix"] @ query
+      top = np.argpartition(-scores, k - 1)[:k] if count > k else np.arange(count)
+      top = top[np.argsort(-scores[top], kind="stable")]
+      rows.extend((int(entry["ids"][i]), project_id, entry["contents"][i], float(scores[i])) for i in top)
+    rows.sort(key=lambda row: -row[3])
+    return rows[:k]
+
+  def invalidate(self, project_id: Optional[str] = None):
+    if project_id is None:
+      self._entries.clear()
+      self._skipped.clear()
+      self._bytes = 0
+    else:
+      self._drop(project_id)
+      self._skipped.pop(project_id, None)
+
+  def stats(self) -> Dict[str, Any]:
+    lookups = self.counters["hits"] + self.counters["fallbacks"]
+    return {
+      **self.counters,
+      "enabled": self.enabled,
+      "projects": list(self._entries.keys()),
+      "bytes": self._bytes,
+      "hit_rate": self.counters["hits"] / lookups if lookups else 0.0
+    }
@@ -1,13 +1,18 @@
 from fastapi import FastAPI, BackgroundTasks, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from app.core.rag_logic import rag_engine
 from app.core.ai_client import ai_client
+from app.core.ingest_jobs import ingest_jobs
+from app.core.section_context import section_context
+from app.core.db_pool import pool_metrics
+from app.core.uploads import spool_upload, discard_upload, UploadTooLarge
 from typing import Dict, Any, Optional, List
-from contextlib import asynccontextmanager
-import shutil
+from contextlib import asynccontextmanager, aclosing
 import os
 import json
+import asyncio
 import logging
 from app.core.logger import logger
 from app.core.templates import (
@@ -20,6 +25,8 @@ from app.core.templates import (
   FORMATING_STYLE
 )
 from app.core.schemas import TZSection, TZDocument
+from app.core.section_stream import SectionStreamParser
+from app.core.section_store import section_store, section_fingerprint
 from app.core.utils import SECTION_CONTEXT_MAPPING
 
 @asynccontextmanager
@@ -30,7 +37,15 @@ async def lifespan(app: FastAPI):
     logging.info("DB ready")
   except Exception as e:
     logger.error(f"DB error: {e}")
+  # Warmup runs in the background: uvicorn binds right away and /api/health/ready reports 503 until it is done
+  warmup_task = rag_engine.start_warmup(then=section_context.warm)
+  ingest_jobs.start()
+  await ai_client.start()
   yield
+  warmup_task.cancel()
+  await ai_client.close()
+  await ingest_jobs.shutdown()
+  await rag_engine.close()
   logging.info("Server stopped")
 
 app = FastAPI(
@@ -71,24 +86,145 @@ class GenerateSpecRequest(BaseModel):
   mode: str
   messages: List[Message]
   context: ContextData
+  # generate_tz only: one LLM call per target section instead of one call for all (default: GENERATION_FANOUT)
+  fanout: Optional[bool] = None
+  # generate_tz with a project_id: reuse stored sections whose inputs did not change (default: SECTION_REUSE)
+  reuse_sections: Optional[bool] = None
 
-@app.post("/api/upload")
+GENERATION_FANOUT = os.getenv("GENERATION_FANOUT", "0") == "1"
+GENERATION_FANOUT_CONCURRENCY = int(os.getenv("GENERATION_FANOUT_CONCURRENCY", "4"))
+SECTION_REUSE = os.getenv("SECTION_REUSE", "0") == "1"
+
+@app.post("/api/upload", status_code=202)
 async def upload_project_doc(project_id: str, file: UploadFile = File(...)):
-  temp_path = f"temp_{file.filename}"
-  with open(temp_path, "wb") as buffer:
-    shutil.copyfileobj(file.file, buffer)
+  # Chunks are diffed per document, so the filename is what tells a re-upload from a new file
+  document = os.path.basename(file.filename or "") or "upload"
+  try:
+    source = await spool_upload(file)
+  except UploadTooLarge as e:
+    raise HTTPException(status_code=413, detail=str(e))
+  finally:
+    await file.close()
+
+  try:
+    job_id = ingest_jobs.submit(project_id, document, source)
+  except OverflowError as e:
+    discard_upload(source)
+    raise HTTPException(status_code=429, detail=str(e))
+  except RuntimeError as e:
+    discard_upload(source)
+    raise HTTPException(status_code=503, detail=str(e))
+
+  return {"status": "queued", "project_id": project_id, "document": document, "job_id": job_id}
+
+@app.get("/api/upload/{job_id}")
+async def upload_job_status(job_id: str):
+  job = ingest_jobs.status(job_id)
+  if job is None:
+    raise HTTPException(status_code=404, detail="Ingestion job not found")
+  return job
+
+def questionnaire_slice(questionnaire: Dict[str, Any], target_ids: List[str]) -> Dict[str, Any]:
+  # Only the questionnaire keys the sections depend on (SECTION_CONTEXT_MAPPING) plus basic project data
+  full_q_data = json.loads(json.dumps(questionnaire, ensure_ascii=False))
+  clean_full_data = clean_empty_fields(full_q_data)
+  final_context_data = {}
+    
+  needed_keys = set()
+  for tid in target_ids:
+    base_id = tid.split('.')[0]
+    needed_keys.update(SECTION_CONTEXT_MAPPING.get(base_id, []))
+
+  if not needed_keys:
+    final_context_data = clean_full_data
+  else:
+    for key in needed_keys:
+      if key in clean_full_data:
+        final_context_data[key] = clean_full_data[key]
+    if "project_info" in clean_full_data:
+      if "project_info" not in final_context_data:
+        final_context_data["project_info"] = {}
+      final_context_data["project_info"]["basic_data"] = clean_full_data["project_info"].get("basic_data", {})
+  return final_context_data
+
+async def build_tz_messages(data: GenerateSpecRequest, target_ids: List[str]) -> List[Dict[str, Any]]:
+  # Prompt for one generate_tz call covering target_ids: their regulations, reference chunks,
+  # few-shot example and questionnaire slice
+  questionnaire_text = json.dumps(data.context.questionnaire, ensure_ascii=False, indent=2)
+  first_target = target_ids[0] if target_ids else "1"
+  # Regulation and reference chunks are precomputed per section and refreshed on corpus re-ingestion.
+  # Every requested section contributes its own context; chunks shared between sections appear once.
+  section_chunks = await section_context.get_many(target_ids or [first_target])
+  reg_chunks = dedupe_chunks(reg for reg, _ in section_chunks.values())
+  ref_chunks = dedupe_chunks(ref for _, ref in section_chunks.values())
+
+  if reg_chunks:
+    reg_text = "\n".join([f"--- Нормативна вимога ---\n{c['content']}" for c in reg_chunks])
+  else:
+    reg_text = "Специфічні вимоги не знайдені. Використовуй загальні стандарти ДСТУ 3008:2015."
+
+  if ref_chunks:
+    ref_text = "\n".join([f"--- ЗРАЗОК З РЕФЕРЕНСНОГО ТЗ ---\n{c['content']}" for c in ref_chunks])
+  else:
+    ref_text = "Приклади відсутні. Використовуй стандартний офіційний стиль."
+  
+  if first_target.startswith("3") or first_target == "3":
+    chosen_example = FEW_SHOT_EXAMPLES["requirements"]
+  elif first_target in ["7", "8", "9"]:
+    chosen_example = FEW_SHOT_EXAMPLES["docs"]
+  else:
+    chosen_example = FEW_SHOT_EXAMPLES["default"]
+
+  try:
+    final_context_data = questionnaire_slice(data.context.questionnaire, target_ids)
+    optimized_questionnaire_text = json.dumps(final_context_data, ensure_ascii=False, indent=2)
+  except Exception as e:
+    logger.warning(f"Optimization failed: {e}")
+    optimized_questionnaire_text = questionnaire_text
+
+  base_section_id = first_target.split('.')[0]
+  specific_instruction = SECTION_SPECIFIC_INSTRUCTIONS.get(
+    base_section_id, 
+    "ФОКУС: Дотримуйся структури розділу та вимог ДСТУ 3008."
+  )
+
+  formatted_system_prompt = SYSTEM_GENERATION_INSTRUCTION.format(
+    section_instruction=specific_instruction,
+    selected_example=chosen_example,
+    JSON_INSTRUCTIONS=JSON_INSTRUCTIONS,
+    FORMATING_STYLE=FORMATING_STYLE
+  )
+
+  final_system_prompt = (
+    f"{formatted_system_prompt}\n\n"
+    
+    f"### ЗАКОНОДАВСТВО (ОБОВ'ЯЗКОВО):\n"
+    f"{reg_text}\n\n"
+
+    f"### ПРИКЛАД ОФОРМЛЕННЯ (СТИЛЬ):\n"
+    f"УВАГА: Використовуй цей стиль і таблиці, АЛЕ НЕ ДАНІ.\n"
+    f"{ref_text}\n\n"
+
+    f"### ДАНІ ПРОЄКТУ (ДЖЕРЕЛО ФАКТІВ):\n"
+    f"{optimized_questionnaire_text}\n"
+  )
+
+  logger.info(f"[RAG GENERATION] {final_system_prompt}")
+
+  new_messages = [{"role": "system", "content": [{"type": "text", "text": final_system_prompt}]}]
   
-  chunks_count = await rag_engine.ingest_docx(project_id, temp_path)
-  os.remove(temp_path)
+  new_messages.append({
+    "role": "user", 
+    "content": [{"type": "text", "text": f"Згенеруй розділи {', '.join(target_ids)} у JSON."}]
+  })
   
-  return {"status": "ok", "project_id": project_id, "chunks_indexed": chunks_count}
+  return new_messages
 
-@app.post("/api/generate")
-async def generate_spec(data: GenerateSpecRequest):
-  target_ids = data.context.target_sections or [str(i) for i in range(1, 11)]
+async def prepare_generation(data: GenerateSpecRequest):
+  # Retrieval and prompt assembly shared by the blocking and the streaming endpoint; rewrites data.messages
+  target_ids = resolve_target_ids(data)
 
   rag_context = ""
-  questionnaire_text = json.dumps(data.context.questionnaire, ensure_ascii=False, indent=2)
 
   if data.mode == "qa_navigation":
     user_query = data.messages[-1].content[0].text if isinstance(data.messages[-1].content, list) else data.messages[-1].content
@@ -119,101 +255,11 @@ async def generate_spec(data: GenerateSpecRequest):
       })
 
   elif data.mode == "generate_tz":
-    first_target = target_ids[0] if target_ids else "1"
-    section_title = TZ_STRUCTURE_TEMPLATE.get(first_target, {}).get("title", "") if isinstance(TZ_STRUCTURE_TEMPLATE.get(first_target), dict) else ""
-
-    reg_query = f"Вимоги до змісту розділу '{first_target} {section_title}' згідно Постанови 205 Додаток 3"
-    reg_chunks = await rag_engine.get_context(reg_query, project_id="SYSTEM_REGULATIONS", scope="system", limit=3)
-
-    ref_query = f"Приклад змісту розділу '{first_target} {section_title}' з технічними деталями та таблицями"
-    ref_chunks = await rag_engine.get_context(ref_query, project_id="TEMPLATE_TZ", scope="project", limit=2)
-
-    if reg_chunks:
-      reg_text = "\n".join([f"--- Нормативна вимога ---\n{c['content']}" for c in reg_chunks])
-    else:
-      reg_text = "Специфічні вимоги не знайдені. Використовуй загальні стандарти ДСТУ 3008:2015."
-
-    if ref_chunks:
-      ref_text = "\n".join([f"--- ЗРАЗОК З РЕФЕРЕНСНОГО ТЗ ---\n{c['content']}" for c in ref_chunks])
-    else:
-      ref_text = "Приклади відсутні. Використовуй стандартний офіційний стиль."
-    
-    if first_target.startswith("3") or first_target == "3":
-      chosen_example = FEW_SHOT_EXAMPLES["requirements"]
-    elif first_target in ["7", "8", "9"]:
-      chosen_example = FEW_SHOT_EXAMPLES["docs"]
-    else:
-      chosen_example = FEW_SHOT_EXAMPLES["default"]
-
-    try:
-      full_q_data = json.loads(json.dumps(data.context.questionnaire, ensure_ascii=False))
-      clean_full_data = clean_empty_fields(full_q_data)
-      final_context_data = {}
-        
-      needed_keys = set()
-      for tid in target_ids:
-        base_id = tid.split('.')[0]
-        needed_keys.update(SECTION_CONTEXT_MAPPING.get(base_id, []))
-
-      if not needed_keys:
-        final_context_data = clean_full_data
-      else:
-        for key in needed_keys:
-          if key in clean_full_data:
-            final_context_data[key] = clean_full_data[key]
-        if "project_info" in clean_full_data:
-          if "project_info" not in final_context_data:
-            final_context_data["project_info"] = {}
-          final_context_data["project_info"]["basic_data"] = clean_full_data["project_info"].get("basic_data", {})
-
-      optimized_questionnaire_text = json.dumps(final_context_data, ensure_ascii=False, indent=2)
-    except Exception as e:
-      logger.warning(f"Optimization failed: {e}")
-      optimized_questionnaire_text = questionnaire_text
-
-    base_section_id = first_target.split('.')[0]
-    specific_instruction = SECTION_SPECIFIC_INSTRUCTIONS.get(
-      base_section_id, 
-      "ФОКУС: Дотримуйся структури розділу та вимог ДСТУ 3008."
-    )
-
-    formatted_system_prompt = SYSTEM_GENERATION_INSTRUCTION.format(
-      section_instruction=specific_instruction,
-      selected_example=chosen_example,
-      JSON_INSTRUCTIONS=JSON_INSTRUCTIONS,
-      FORMATING_STYLE=FORMATING_STYLE
-    )
-
-    final_system_prompt = (
-      f"{formatted_system_prompt}\n\n"
-      
-      f"### ЗАКОНОДАВСТВО (ОБОВ'ЯЗКОВО):\n"
-      f"{reg_text}\n\n"
-
-      f"### ПРИКЛАД ОФОРМЛЕННЯ (СТИЛЬ):\n"
-      f"УВАГА: Використовуй цей стиль і таблиці, АЛЕ НЕ ДАНІ.\n"
-      f"{ref_text}\n\n"
-
-      f"### ДАНІ ПРОЄКТУ (ДЖЕРЕЛО ФАКТІВ):\n"
-      f"{optimized_questionnaire_text}\n"
-    )
-
-    logger.info(f"[RAG GENERATION] {final_system_prompt}")
+    data.messages = await build_tz_messages(data, target_ids)
 
-    new_messages = [{"role": "system", "content": [{"type": "text", "text": final_system_prompt}]}]
-    
-    new_messages.append({
-      "role": "user", 
-      "content": [{"type": "text", "text": f"Згенеруй розділи {', '.join(target_ids)} у JSON."}]
-    })
-    
-    data.messages = new_messages
-  
-  raw_response = await ai_client.generate_structured_response(data, rag_context_str=rag_context)
-
-  if raw_response.get("status") == "error":
-    return raw_response
+  return target_ids, rag_context
 
+def finalize_generation(data: GenerateSpecRequest, target_ids: List[str], rag_context: str, raw_response: Dict[str, Any]):
   if data.mode == "generate_tz":
     try:
       output_data = raw_response.get("output", {})
@@ -231,24 +277,11 @@ async def generate_spec(data: GenerateSpecRequest):
       
       for code in target_ids:
         if code not in existing_codes:
-          sec_def = TZ_STRUCTURE_TEMPLATE.get(code, "Розділ")
-          sec_name = sec_def["title"] if isinstance(sec_def, dict) else sec_def
-
-          validated_doc.sections.append(TZSection(
-            code=code,
-            name=sec_name,
-            content="Розділ не був згенерований моделлю. Спробуйте повторити запит.",
-            status="incomplete"
-          ))
+          validated_doc.sections.append(missing_section(code))
       
-      def sort_key(x):
-        try:
-          return [int(part) for part in x.code.split('.')]
-        except:
-          return 999
-      validated_doc.sections.sort(key=sort_key)
+      validated_doc.sections.sort(key=section_sort_key)
       
-      raw_response["output"]["document"]["sections"] = [s.dict() for s in validated_doc.sections]
+      raw_response["output"].setdefault("document", {})["sections"] = [s.dict() for s in validated_doc.sections]
       raw_response["output"]["diagnostics"] = {
         "rag_source": "SYSTEM_REGULATIONS" if rag_context else "None",
         "thought_process": output_data.get("thought_process", "N/A")
@@ -260,10 +293,229 @@ async def generate_spec(data: GenerateSpecRequest):
   
   return raw_response
 
+def use_fanout(data: GenerateSpecRequest, target_ids: List[str]) -> bool:
+  enabled = data.fanout if data.fanout is not None else GENERATION_FANOUT
+  return enabled and data.mode == "generate_tz" and len(target_ids) > 1
+
+async def generate_fanout(data: GenerateSpecRequest, target_ids: List[str]):
+  # One independent generate_tz call per section, at most GENERATION_FANOUT_CONCURRENCY at a time.
+  # Yields (code, sections) in completion order; a failed call only loses its own section.
+  await section_context.get_many(target_ids)
+  semaphore = asyncio.Semaphore(GENERATION_FANOUT_CONCURRENCY)
+
+  async def run(code: str):
+    try:
+      section_data = GenerateSpecRequest(
+        mode=data.mode,
+        messages=[],
+        context=ContextData(**{**data.context.dict(), "target_sections": [code]})
+      )
+      section_data.messages = await build_tz_messages(section_data, [code])
+      async with semaphore:
+        raw_response = await ai_client.generate_structured_response(section_data, rag_context_str="")
+
+      if raw_response.get("status") == "error":
+        logger.error(f"Fan-out generation of section {code} failed: {raw_response.get('message')}")
+        return code, [missing_section(code).dict()], None
+      result = finalize_generation(section_data, [code], "", raw_response)
+      output = result.get("output", {})
+      # Only the section itself and its subsections are kept, so parallel calls cannot collide
+      sections = owned_sections(code, output.get("document", {}).get("sections", [])) or [missing_section(code).dict()]
+      return code, sections, output.get("diagnostics", {}).get("thought_process")
+    except Exception as e:
+      logger.error(f"Fan-out generation of section {code} failed: {e}")
+      return code, [missing_section(code).dict()], None
+
+  tasks = [asyncio.create_task(run(code)) for code in target_ids]
+  try:
+    for task in asyncio.as_completed(tasks):
+      yield await task
+  finally:
+    # The consumer stopped early (client disconnected, generator closed): drop the remaining LLM calls
+    for task in tasks:
+      task.cancel()
+
+def merge_fanout(results: List[Any]) -> Dict[str, Any]:
+  sections = [TZSection(**section) for _, code_sections, _ in results for section in code_sections]
+  document = TZDocument(sections=sorted(sections, key=section_sort_key))
+  return {
+    "output": {
+      "document": {"sections": [s.dict() for s in document.sections]},
+      "diagnostics": {
+        "rag_source": "None",
+        "thought_process": {code: thought for code, _, thought in results if thought},
+        "fanout": {
+          "sections": len(results),
+          "incomplete": [s.code for s in document.sections if s.status == "incomplete"]
+        }
+      }
+    }
+  }
+
+async def plan_sections(data: GenerateSpecRequest, target_ids: List[str]) -> Optional[Dict[str, Any]]:
+  # Fingerprints every requested section's inputs and picks the stored sections that are still valid
+  project_id = data.context.task_metadata.project_id if data.context.task_metadata else None
+  reuse = data.reuse_sections if data.reuse_sections is not None else SECTION_REUSE
+  if data.mode != "generate_tz" or not project_id or not reuse:
+    return None
+
+  section_chunks = await section_context.get_many(target_ids)
+  fingerprints = {
+    code: section_fingerprint(
+      questionnaire_slice(data.context.questionnaire, [code]),
+      [c["id"] for c in section_chunks[code][0] + section_chunks[code][1]],
+      ai_client.model or ""
+    )
+    for code in target_ids
+  }
+  stored = await section_store.load(project_id, target_ids)
+  cached = {
+    code: sections for code, (fingerprint, sections) in stored.items()
+    if fingerprint == fingerprints[code]
+  }
+  logger.info(f"[SECTION REUSE] project '{project_id}': reusing {sorted(cached)}, regenerating {[c for c in target_ids if c not in cached]}")
+  return {"project_id": project_id, "fingerprints": fingerprints, "cached": cached}
+
+async def apply_section_plan(plan: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+  # Stores the freshly generated sections and merges the reused ones into the response
+  output = response.setdefault("output", {})
+  pending = [code for code in plan["fingerprints"] if code not in plan["cached"]]
+  # Sections the model emitted for reused codes are dropped, so no code appears twice
+  emitted = output.get("document", {}).get("sections", [])
+  generated = [s for s in emitted if any(owned_sections(code, [s]) for code in pending)]
+  entries = {}
+  for code in pending:
+    own = owned_sections(code, generated)
+    if not own:
+      # Generation failed for this code (e.g. finalize could not validate the output)
+      generated.append(missing_section(code).dict())
+    # Placeholders for sections the model skipped are never persisted
+    elif all(s.get("status") != "incomplete" for s in own):
+      entries[code] = (plan["fingerprints"][code], own)
+  try:
+    await section_store.save(plan["project_id"], entries)
+  except Exception as e:
+    logger.error(f"Could not store generated sections: {e}")
+
+  reused = [s for sections in plan["cached"].values() for s in sections]
+  sections = [TZSection(**s) for s in generated + reused]
+  output.setdefault("document", {})["sections"] = [s.dict() for s in sorted(sections, key=section_sort_key)]
+  output.setdefault("diagnostics", {})["sections"] = {
+    "reused": sorted(plan["cached"], key=code_sort_key),
+    "regenerated": pending
+  }
+  return response
+
+async def run_generation(data: GenerateSpecRequest, target_ids: List[str]) -> Dict[str, Any]:
+  if use_fanout(data, target_ids):
+    return merge_fanout([result async for result in generate_fanout(data, target_ids)])
+
+  target_ids, rag_context = await prepare_generation(data)
+  raw_response = await ai_client.generate_structured_response(data, rag_context_str=rag_context)
+
+  if raw_response.get("status") == "error":
+    return raw_response
+
+  return finalize_generation(data, target_ids, rag_context, raw_response)
+
+@app.post("/api/generate")
+async def generate_spec(data: GenerateSpecRequest):
+  target_ids = resolve_target_ids(data)
+  plan = await plan_sections(data, target_ids)
+  if plan is None:
+    return await run_generation(data, target_ids)
+
+  # Only sections whose inputs changed go to the LLM
+  pending = [code for code in target_ids if code not in plan["cached"]]
+  response = empty_generation()
+  if pending:
+    data.context.target_sections = pending
+    response = await run_generation(data, pending)
+    if response.get("status") == "error":
+      return response
+  return await apply_section_plan(plan, response)
+
+@app.post("/api/generate/stream")
+async def generate_spec_stream(data: GenerateSpecRequest):
+  # Same pipeline as /api/generate, sent as Server-Sent Events: "start" right away, "token" for every
+  # upstream delta, "section" for every TZ section as soon as it is complete and valid,
+  # then "done" with the validated response (or "error")
+  async def events():
+    yield sse_event("start", {"mode": data.mode})
+    try:
+      target_ids = resolve_target_ids(data)
+      plan = await plan_sections(data, target_ids)
+      if plan is not None:
+        # Reused sections are sent first, only the changed ones are generated
+        for sections in plan["cached"].values():
+          for section in sections:
+            yield sse_event("section", section)
+        target_ids = [code for code in target_ids if code not in plan["cached"]]
+        if not target_ids:
+          yield sse_event("done", await apply_section_plan(plan, empty_generation()))
+          return
+        data.context.target_sections = target_ids
+
+      async def finish(response):
+        return await apply_section_plan(plan, response) if plan is not None else response
+
+      if use_fanout(data, target_ids):
+        # Parallel calls would interleave their tokens, so fan-out streams whole sections only
+        results = []
+        async with aclosing(generate_fanout(data, target_ids)) as fanout:
+          async for result in fanout:
+            results.append(result)
+            for section in result[1]:
+              yield sse_event("section", section)
+        yield sse_event("done", await finish(merge_fanout(results)))
+        return
+
+      target_ids, rag_context = await prepare_generation(data)
+      parser = SectionStreamParser() if data.mode == "generate_tz" else None
+      raw_response = None
+      async for chunk in ai_client.stream_structured_response(data, rag_context_str=rag_context):
+        if chunk["type"] == "token":
+          yield sse_event("token", {"text": chunk["text"]})
+          if parser is not None:
+            for section in parser.feed(chunk["text"]):
+              yield sse_event("section", section.dict())
+        elif chunk["type"] == "response":
+          raw_response = chunk["response"]
+
+      if raw_response is None or raw_response.get("status") == "error":
+        yield sse_event("error", raw_response or {"status": "error", "message": "AI Client Error: empty stream"})
+        return
+      yield sse_event("done", await finish(finalize_generation(data, target_ids, rag_context, raw_response)))
+    except Exception as e:
+      logger.error(f"Streaming generation failed: {e}")
+      yield sse_event("error", {"status": "error", "message": str(e)})
+
+  return StreamingResponse(
+    events(),
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+  )
+
 @app.get("/api/health/ai")
 async def health_check_ai():
   return await ai_client.check_connection()
 
+@app.get("/api/health/ready")
+async def health_check_ready():
+  readiness = rag_engine.readiness()
+  return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+@app.get("/api/metrics")
+async def metrics():
+  return {
+    "embedding_cache": rag_engine.embeddings.stats(),
+    "query_batcher": rag_engine.query_embedder.stats(),
+    "vector_index": rag_engine.vector_index.stats(),
+    "retrieval_cache": rag_engine.result_cache.stats(),
+    "db_pool": pool_metrics.stats(rag_engine.engine.pool),
+    "ai_http": ai_client.metrics.stats()
+  }
+
 @app.get("/api/projects")
 async def list_projects():
   try:
@@ -273,6 +525,61 @@ async def list_projects():
     logger.error(f"Error loading list of projects: {e}")
     return {"projects": []}
 
+@app.delete("/api/projects/{project_id}")
+async def delete_project(project_id: str):
+  # Stored sections are keyed by the requested project_id, which may never have had chunks
+  deleted = await rag_engine.delete_project(project_id)
+  sections_deleted = await section_store.delete(project_id)
+  if deleted is None and not sections_deleted:
+    raise HTTPException(status_code=404, detail="Project not found")
+  return {
+    "status": "deleted",
+    "project_id": project_id,
+    "chunks_deleted": deleted or 0,
+    "sections_deleted": sections_deleted
+  }
+
+def resolve_target_ids(data: GenerateSpecRequest) -> List[str]:
+  return data.context.target_sections or [str(i) for i in range(1, 11)]
+
+def missing_section(code: str) -> TZSection:
+  sec_def = TZ_STRUCTURE_TEMPLATE.get(code, "Розділ")
+  sec_name = sec_def["title"] if isinstance(sec_def, dict) else sec_def
+  return TZSection(
+    code=code,
+    name=sec_name,
+    content="Розділ не був згенерований моделлю. Спробуйте повторити запит.",
+    status="incomplete"
+  )
+
+def owned_sections(code: str, sections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+  # The section with this code and its subsections
+  return [s for s in sections if s["code"] == code or s["code"].startswith(f"{code}.")]
+
+def code_sort_key(code: str):
+  try:
+    return [int(part) for part in code.split('.')]
+  except:
+    return [999]
+
+def section_sort_key(x):
+  return code_sort_key(x.code)
+
+def empty_generation() -> Dict[str, Any]:
+  return {"output": {"document": {"sections": []}, "diagnostics": {"rag_source": "None"}}}
+
+def sse_event(event: str, data: Any) -> str:
+  return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def dedupe_chunks(groups) -> list:
+  seen, chunks = set(), []
+  for group in groups:
+    for chunk in group:
+      if chunk["id"] not in seen:
+        seen.add(chunk["id"])
+        chunks.append(chunk)
+  return chunks
+
 def clean_empty_fields(data):
   if isinstance(data, dict):
     return {
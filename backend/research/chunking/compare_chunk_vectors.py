@@ -0,0 +1,51 @@
+import sys
+import time
+import numpy as np
+from app.core.rag_logic import RAGEngine
+from app.core.logger import logger
+
+def compare_modes(file_path: str, project_id: str = "COMPARE"):
+  rag = RAGEngine()
+  # Time the raw model, not the embedding cache
+  rag.text_splitter.embeddings = rag.embeddings.base
+  documents = rag._load_documents(file_path)
+  intermediate_docs = rag.base_splitter.split_documents(documents)
+
+  # Pooled mode: one embedding pass over sentences, chunk vectors come for free
+  start_time = time.perf_counter()
+  chunks, pooled = rag.text_splitter.split_documents_with_vectors(intermediate_docs)
+  pooled_duration = time.perf_counter() - start_time
+  if not chunks:
+    logger.error("Document produced no chunks.")
+    return
+
+  # Re-embed mode: the same chunks go through the model a second time with the project prefix
+  start_time = time.perf_counter()
+  contextual_texts = [f"Проект: {project_id}. Зміст: {c.page_content}" for c in chunks]
+  reembedded = rag.embeddings.base.embed_documents(contextual_texts)
+  reembed_duration = time.perf_counter() - start_time
+
+  a = np.asarray(pooled, dtype=np.float32)
+  b = np.asarray(reembedded, dtype=np.float32)
+  b /= np.linalg.norm(b, axis=1, keepdims=True)
+  agreement = np.einsum("ij,ij->i", a, b)
+
+  # Does the nearest re-embedded neighbour of each pooled vector point at the same chunk?
+  top1 = float(np.mean(np.argmax(a @ b.T, axis=1) == np.arange(len(chunks))))
+
+  print("\n" + "="*50)
+  print(f"{'CHUNK VECTOR MODE COMPARISON':^50}")
+  print("="*50)
+  print(f"Chunks:                     {len(chunks)}")
+  print(f"Chunking + pooled vectors:  {pooled_duration:.3f} s")
+  print(f"Extra re-embedding pass:    {reembed_duration:.3f} s")
+  print(f"Cosine(pooled, reembed):    mean {agreement.mean():.4f} | min {agreement.min():.4f}")
+  print(f"Top-1 self retrieval:       {top1 * 100:.1f}%")
+  print("="*50 + "\n")
+  logger.info("Comparison finished")
+
+if __name__ == "__main__":
+  if len(sys.argv) < 2:
+    print("Usage: python -m research.chunking.compare_chunk_vectors <file.docx>")
+    sys.exit(1)
+  compare_modes(sys.argv[1])
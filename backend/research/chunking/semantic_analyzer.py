@@ -1,14 +1,15 @@
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
-import torch
+from langchain_huggingface import HuggingFaceEmbeddings
+from app.core.embedding_cache import CachedEmbeddings
 from app.core.logger import logger
 
 class SemanticAnalyzer:
   def __init__(self, model_name='all-mpnet-base-v2'):
     # Using the same model as in RAG engine
     logger.info(f"Initializing SemanticAnalyzer with model: {model_name}")
-    self.model = SentenceTransformer(model_name)
+    # Shares the on-disk cache with the RAG engine, so re-runs skip already embedded sentences
+    self.embeddings = CachedEmbeddings(HuggingFaceEmbeddings(model_name=model_name), model_key=model_name)
 
   def calculate_variance(self, chunk_text: str):
     # Split chunk into sentences
@@ -21,7 +22,7 @@ class SemanticAnalyzer:
       }
 
     # 1. Generate embeddings for each sentence
-    embeddings = self.model.encode(sentences)
+    embeddings = np.asarray(self.embeddings.embed_documents(sentences))
 
     # 2. Calculate the Centroid (average vector of the chunk)
     centroid = np.mean(embeddings, axis=0).reshape(1, -1)
@@ -0,0 +1,72 @@
+import json
+import sys
+import time
+import numpy as np
+from app.core.embedding_backends import build_embedding_backend, EMBEDDING_BACKENDS
+from app.core.logger import logger
+
+MODEL_NAME = "all-mpnet-base-v2"
+
+def load_texts(limit: int = 256):
+  # Real queries plus specification sentences, so both short and long inputs are covered
+  with open("research/data/gold_standard.json", "r", encoding="utf-8") as f:
+    texts = [case["query"] for case in json.load(f)]
+  with open("research/data/enhanced_output.md", "r", encoding="utf-8") as f:
+    texts += [line.strip("# ").strip() for line in f if len(line.strip()) > 20]
+  return texts[:limit]
+
+def unit(vectors):
+  vectors = np.asarray(vectors, dtype=np.float32)
+  return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def measure(backend, texts, single_runs: int = 30):
+  backend.embed_documents(texts[:8])
+
+  single = []
+  for text in texts[:single_runs]:
+    start_time = time.perf_counter()
+    backend.embed_query(text)
+    single.append((time.perf_counter() - start_time) * 1000)
+
+  start_time = time.perf_counter()
+  vectors = backend.embed_documents(texts)
+  batch_duration = time.perf_counter() - start_time
+  return unit(vectors), {
+    "p50_ms": float(np.percentile(single, 50)),
+    "p95_ms": float(np.percentile(single, 95)),
+    "texts_per_sec": len(texts) / batch_duration
+  }
+
+def run(backends):
+  texts = load_texts()
+  logger.info(f"Comparing backends {backends} on {len(texts)} texts...")
+
+  reference, results = None, {}
+  for name in ["torch"] + [b for b in backends if b != "torch"]:
+    start_time = time.perf_counter()
+    backend = build_embedding_backend(MODEL_NAME, name)
+    load_duration = time.perf_counter() - start_time
+    vectors, timings = measure(backend, texts)
+    if reference is None:
+      reference = vectors
+    agreement = np.einsum("ij,ij->i", reference, vectors)
+    # Neighbour parity: does the backend rank the same text first for every text?
+    top1 = float(np.mean(np.argsort(-(vectors @ vectors.T), axis=1)[:, 1] == np.argsort(-(reference @ reference.T), axis=1)[:, 1]))
+    results[name] = {**timings, "load_s": load_duration, "cos_mean": float(agreement.mean()), "cos_min": float(agreement.min()), "nn_parity": top1}
+
+  base = results["torch"]
+  print("\n" + "="*96)
+  print(f"{'EMBEDDING BACKEND PARITY & LATENCY':^96}")
+  print("="*96)
+  print(f"{'Backend':<12} | {'cos mean':>8} | {'cos min':>8} | {'NN parity':>9} | {'p50 ms':>7} | {'p95 ms':>7} | {'texts/s':>8} | {'speedup':>7}")
+  print("-" * 96)
+  for name, r in results.items():
+    print(
+      f"{name:<12} | {r['cos_mean']:>8.4f} | {r['cos_min']:>8.4f} | {r['nn_parity'] * 100:>8.1f}% | "
+      f"{r['p50_ms']:>7.2f} | {r['p95_ms']:>7.2f} | {r['texts_per_sec']:>8.1f} | {r['texts_per_sec'] / base['texts_per_sec']:>6.2f}x"
+    )
+  print("="*96 + "\n")
+  return results
+
+if __name__ == "__main__":
+  run(sys.argv[1:] or list(EMBEDDING_BACKENDS))
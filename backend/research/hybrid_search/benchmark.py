@@ -25,12 +25,19 @@ class BenchmarkRunner:
     total = len(self.test_cases)
     logger.info(f"Starting performance benchmark for {total} test cases...")
 
-    for case in self.test_cases:
+    modes = list(results.keys())
+    # All queries in all modes are embedded in one batch and searched concurrently
+    batch = await rag_engine.get_context_many([
+      {"query": case["query"], "search_mode": mode}
+      for case in self.test_cases for mode in modes
+    ], limit=5)
+
+    for case_index, case in enumerate(self.test_cases):
       query = case["query"]
       expected_ids = [str(eid) for eid in case["expected_ids"]]
       
-      for mode in ["vector", "keyword", "hybrid"]:
-        retrieved_chunks = await rag_engine.get_context(query=query, search_mode=mode, limit=5)
+      for mode_index, mode in enumerate(modes):
+        retrieved_chunks = batch[case_index * len(modes) + mode_index]
         retrieved_ids = [str(r["id"]) for r in retrieved_chunks]
 
         hit_index = next((i for i, rid in enumerate(retrieved_ids) if rid in expected_ids), None)
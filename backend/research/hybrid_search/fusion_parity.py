@@ -0,0 +1,41 @@
+import asyncio
+import json
+import time
+from app.core.rag_logic import rag_engine
+from app.core.logger import logger
+
+async def compare_fusion(data_path: str = "research/data/gold_standard.json", limit: int = 5, repeats: int = 3):
+  with open(data_path, "r", encoding="utf-8") as f:
+    queries = [case["query"] for case in json.load(f)]
+  # Every repeat must reach the database, not the result cache
+  rag_engine.result_cache.max_items = 0
+
+  timings = {"python": 0.0, "sql": 0.0}
+  mismatches = 0
+  for query in queries:
+    results = {}
+    for fusion in ["python", "sql"]:
+      start_time = time.perf_counter()
+      for _ in range(repeats):
+        results[fusion] = await rag_engine.get_context(query=query, search_mode="hybrid", limit=limit, fusion=fusion)
+      timings[fusion] += (time.perf_counter() - start_time) / repeats
+
+    python_ids = [r["id"] for r in results["python"]]
+    sql_ids = [r["id"] for r in results["sql"]]
+    score_diff = max((abs(a["score"] - b["score"]) for a, b in zip(results["python"], results["sql"])), default=0.0)
+    if python_ids != sql_ids or score_diff > 1e-6:
+      mismatches += 1
+      logger.info(f"Mismatch for '{query}': python={python_ids} sql={sql_ids} max score diff={score_diff:.2e}")
+
+  total = len(queries)
+  print("\n" + "="*50)
+  print(f"{'HYBRID FUSION PARITY REPORT':^50}")
+  print("="*50)
+  print(f"Queries:             {total}")
+  print(f"Identical top-{limit}:      {total - mismatches}/{total}")
+  print(f"Avg latency python:  {timings['python'] / total * 1000:.2f} ms")
+  print(f"Avg latency sql:     {timings['sql'] / total * 1000:.2f} ms")
+  print("="*50 + "\n")
+
+if __name__ == "__main__":
+  asyncio.run(compare_fusion())
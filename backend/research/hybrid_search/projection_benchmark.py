@@ -0,0 +1,52 @@
+import asyncio
+import json
+import time
+import statistics
+from sqlalchemy import select
+from app.core.rag_logic import rag_engine, ProjectChunk
+from app.core.logger import logger
+
+async def legacy_vector_search(query_vector):
+  # The pre-projection query: full ORM rows including the 768-dim embedding column
+  async with rag_engine.async_session() as session:
+    distance = ProjectChunk.embedding.cosine_distance(query_vector)
+    result = await session.execute(select(ProjectChunk, distance.label("distance")).order_by(distance).limit(50))
+    return [(chunk.id, chunk.content, 1 - dist) for chunk, dist in result.all()]
+
+async def run(data_path: str = "research/data/gold_standard.json", repeats: int = 20):
+  with open(data_path, "r", encoding="utf-8") as f:
+    queries = [case["query"] for case in json.load(f)]
+  vectors = rag_engine.embeddings.embed_documents(queries)
+  logger.info(f"Benchmarking retrieval decode paths on {len(queries)} queries x {repeats} runs...")
+
+  variants = {
+    "ORM full rows": lambda query, vector: legacy_vector_search(vector),
+    "ORM projection": lambda query, vector: rag_engine._search_orm(query, vector, None, "vector", 50, "project", None, None, "sql"),
+    "asyncpg projection": lambda query, vector: rag_engine._search_asyncpg(query, vector, None, "vector", 50, "project", None, None, "sql"),
+  }
+
+  timings = {}
+  for name, search in variants.items():
+    # Warm connections and prepared statements before measuring
+    await search(queries[0], vectors[0])
+    samples = []
+    for _ in range(repeats):
+      for query, vector in zip(queries, vectors):
+        start_time = time.perf_counter()
+        await search(query, vector)
+        samples.append((time.perf_counter() - start_time) * 1000)
+    timings[name] = samples
+
+  print("\n" + "="*60)
+  print(f"{'RETRIEVAL PROJECTION BENCHMARK (top-50 vector)':^60}")
+  print("="*60)
+  print(f"{'Path':<22} | {'p50 ms':>8} | {'p95 ms':>8} | {'mean ms':>8}")
+  print("-" * 60)
+  for name, samples in timings.items():
+    samples.sort()
+    print(f"{name:<22} | {statistics.median(samples):>8.2f} | {samples[int(len(samples) * 0.95) - 1]:>8.2f} | {statistics.mean(samples):>8.2f}")
+  print("="*60 + "\n")
+  await rag_engine.close()
+
+if __name__ == "__main__":
+  asyncio.run(run())
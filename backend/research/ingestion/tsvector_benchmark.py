@@ -0,0 +1,75 @@
+import asyncio
+import sys
+import time
+import numpy as np
+from sqlalchemy import select, func, text
+from app.core.rag_logic import rag_engine, ProjectChunk, chunk_hash
+from app.core.logger import logger
+
+MODES = ["trigger", "inline"]
+
+def build_rows(project_id: str, count: int):
+  # Real specification text, made unique per row; vectors are random because only the write path is measured
+  with open("research/data/enhanced_output.md", "r", encoding="utf-8") as f:
+    paragraphs = [p.strip() for p in f.read().split("\n\n") if len(p.strip()) > 40]
+  rng = np.random.default_rng(0)
+  vectors = rng.normal(size=(count, 768)).astype(np.float32)
+  vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+  rows = []
+  for i in range(count):
+    content = f"{paragraphs[i % len(paragraphs)]} [{i}]"
+    rows.append({"project_id": project_id, "document": "benchmark", "content": content, "content_hash": chunk_hash(content), "embedding": vectors[i].tolist()})
+  return rows
+
+async def vacuum():
+  # Dead tuples of the previous round would otherwise slow down whichever mode runs next
+  async with rag_engine.engine.connect() as conn:
+    conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+    await conn.execute(text("VACUUM ANALYZE project_chunks"))
+
+async def run_mode(mode: str, count: int):
+  project_id = f"BENCH_TSVECTOR_{mode.upper()}"
+  await rag_engine.delete_project(project_id)
+  await vacuum()
+  rows = build_rows(project_id, count)
+  logger.info(f"Storing {count} rows with tsvector mode '{mode}'...")
+
+  start_time = time.perf_counter()
+  await rag_engine.store_chunks(project_id, "benchmark", rows, tsvector_mode=mode)
+  duration = time.perf_counter() - start_time
+
+  async with rag_engine.async_session() as session:
+    missing = await session.scalar(
+      select(func.count()).select_from(ProjectChunk).where(ProjectChunk.project_id == project_id, ProjectChunk.search_vector.is_(None))
+    )
+  await rag_engine.delete_project(project_id)
+  return duration, missing
+
+async def run(count: int = 5000, rounds: int = 3):
+  results = {mode: {"seconds": [], "missing": 0} for mode in MODES}
+  for round_index in range(rounds):
+    # Alternating the order keeps table and index growth from favouring one mode
+    for mode in (MODES if round_index % 2 == 0 else MODES[::-1]):
+      duration, missing = await run_mode(mode, count)
+      results[mode]["seconds"].append(duration)
+      results[mode]["missing"] += missing
+
+  print("\n" + "="*72)
+  print(f"{'TSVECTOR MAINTENANCE BENCHMARK':^72}")
+  print("="*72)
+  print(f"{'Mode':<12} | {'Rows':>6} | {'Rounds':>6} | {'Median s':>8} | {'Rows/sec':>9} | {'Min-max rows/sec':>16} | {'No tsv':>6}")
+  print("-" * 72)
+  for mode, r in results.items():
+    seconds = np.asarray(r["seconds"])
+    r["rows_per_sec"] = count / float(np.median(seconds))
+    spread = f"{count / seconds.max():.1f}-{count / seconds.min():.1f}"
+    print(f"{mode:<12} | {count:>6} | {rounds:>6} | {np.median(seconds):>8.2f} | {r['rows_per_sec']:>9.1f} | {spread:>16} | {r['missing']:>6}")
+  print(f"Speedup (median): {results['inline']['rows_per_sec'] / results['trigger']['rows_per_sec']:.2f}x")
+  print("="*72 + "\n")
+  await rag_engine.close()
+
+if __name__ == "__main__":
+  asyncio.run(run(
+    int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+    int(sys.argv[2]) if len(sys.argv) > 2 else 3
+  ))
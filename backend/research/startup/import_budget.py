@@ -0,0 +1,51 @@
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+# Line format of `python -X importtime`: "import time: <self us> | <cumulative us> | <indent><module>"
+LINE_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure(target: str = "app.main"):
+  result = subprocess.run(
+    [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+    capture_output=True, text=True
+  )
+  if result.returncode != 0:
+    print(result.stderr[-2000:])
+    raise SystemExit(f"Import of {target} failed")
+
+  per_package = defaultdict(int)
+  top_level = []
+  for line in result.stderr.splitlines():
+    match = LINE_PATTERN.match(line)
+    if not match:
+      continue
+    self_us, cumulative_us, indent, module = int(match[1]), int(match[2]), match[3], match[4]
+    per_package[module.split(".")[0]] += self_us
+    # Modules imported directly by the target (one level of nesting) own the cumulative cost
+    if len(indent) <= 3:
+      top_level.append((cumulative_us, module))
+
+  total_us = sum(per_package.values())
+  return total_us, sorted(per_package.items(), key=lambda x: x[1], reverse=True), sorted(top_level, reverse=True)
+
+def report(target: str = "app.main", limit: int = 15):
+  total_us, packages, top_level = measure(target)
+
+  print("\n" + "="*60)
+  print(f"{'IMPORT-TIME BUDGET: ' + target:^60}")
+  print("="*60)
+  print(f"Total import time: {total_us / 1e6:.3f} s\n")
+  print(f"{'Package (self time)':<40} | {'ms':>8} | {'share':>6}")
+  print("-" * 60)
+  for package, us in packages[:limit]:
+    print(f"{package:<40} | {us / 1000:>8.1f} | {us / total_us * 100:>5.1f}%")
+  print("\n" + f"{'Direct import (cumulative)':<40} | {'ms':>8}")
+  print("-" * 60)
+  for us, module in top_level[:limit]:
+    print(f"{module:<40} | {us / 1000:>8.1f}")
+  print("="*60 + "\n")
+
+if __name__ == "__main__":
+  report(sys.argv[1] if len(sys.argv) > 1 else "app.main")
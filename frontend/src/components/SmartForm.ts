@@ -139,6 +139,8 @@ export class SmartForm extends LitElement {
   @state() private existingProjects: string[] = [];
   @state() private progress = 0;
   @state() private currentStatus = '';
+  // Project and answers of the last completed generation; generating again with the same ones is a "regenerate"
+  private lastGenerationKey = '';
 
   render() {
     return html`
@@ -676,6 +678,9 @@ export class SmartForm extends LitElement {
     this.progress = 0;
 
     const questionnaire = this._serializeForm(form);
+    const generationKey = JSON.stringify([this.selectedProjectId, questionnaire]);
+    // Unchanged sections are reused from the server unless the user explicitly asks for new drafts
+    const reuseSections = generationKey !== this.lastGenerationKey;
     
     const sectionGroups = [
       { ids: ["1"], label: "1. Загальні відомості" },
@@ -704,7 +709,9 @@ export class SmartForm extends LitElement {
           body: JSON.stringify({ 
             mode: "generate_tz", 
             messages: [],
+            reuse_sections: reuseSections,
             context: { 
+              task_metadata: { project_id: this.selectedProjectId },
               questionnaire,
               target_sections: group.ids
             } 
@@ -743,6 +750,7 @@ export class SmartForm extends LitElement {
         
         this.progress = Math.round(((i + 1) / sectionGroups.length) * 100);
       }
+      this.lastGenerationKey = generationKey;
     } catch (error: any) {
       this.errorMessage = error.message;
     } finally {